@@ -0,0 +1,49 @@
+"""wiz/ からゲームに要るファイルだけを集めて wiz.pyxapp と wiz.html（ブラウザ版）を作る
+
+    python package_app.py [起動スクリプト]  # 既定は wiz_v20.py
+
+headless.py（テスト用の pyxel の代用品）と balance.py（バランス調整の CLI）は入れない。
+ゲームは numpy を使うので、wiz.html は pyxel app2html の出力に packages: "numpy" を足したもの
+（app2html の HTML のままだとブラウザで import numpy に失敗する）。
+"""
+import base64
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import pyxel
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = "wiz"
+EXCLUDE = ["headless.py", "balance.py", "__pycache__"]  # 開発用でゲームからは読まないもの
+PACKAGES = "numpy"  # ブラウザ版（Pyodide）で読み込むパッケージ
+
+
+def main(argv):
+    script = argv[1] if len(argv) > 1 else "wiz_v20.py"
+    with tempfile.TemporaryDirectory() as work:
+        shutil.copytree(os.path.join(ROOT, APP_DIR), os.path.join(work, APP_DIR),
+                        ignore=shutil.ignore_patterns(*EXCLUDE))
+        subprocess.run([sys.executable, "-m", "pyxel", "package", APP_DIR, os.path.join(APP_DIR, script)],
+                       cwd=work, check=True)
+        shutil.move(os.path.join(work, APP_DIR + ".pyxapp"), os.path.join(ROOT, APP_DIR + ".pyxapp"))
+    write_html(os.path.join(ROOT, APP_DIR + ".pyxapp"))
+
+
+def write_html(app_file):
+    """app_file を埋め込んで PACKAGES を読み込む HTML を隣に書く"""
+    with open(app_file, "rb") as f:
+        data = base64.b64encode(f.read()).decode()
+    options = {"command": "play", "name": os.path.basename(app_file), "gamepad": "enabled",
+               "packages": PACKAGES, "base64": data}
+    with open(os.path.splitext(app_file)[0] + ".html", "w", encoding="utf-8") as f:
+        f.write("<!doctype html>\n"
+                f'<script src="https://cdn.jsdelivr.net/gh/kitao/pyxel@{pyxel.VERSION}/wasm/pyxel.js"></script>\n'
+                f"<script>\nlaunchPyxel({json.dumps(options)});\n</script>\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# ゲームのモジュールは wiz/ の中で兄弟として import し合うので、そのディレクトリを通しておく
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wiz"))
+
+import headless  # noqa: E402
+
+# テストから読むモジュールも headless の pyxel で描かせる（ウィンドウを開かずに回せる）
+headless.install()
@@ -0,0 +1,26 @@
+from math import prod
+
+from balance import enemy_stats, loadouts, player_stats
+from combat import ATTACK, DEFENSE, HP
+from units import EQUIPMENT_ITEMS, PLAYER_ATTACK, PLAYER_DEFENSE, PLAYER_HP, Slime
+
+
+def test_loadouts_cover_every_choice_per_slot_once():
+    sets = loadouts()
+    slots = {}
+    for item in EQUIPMENT_ITEMS.values():
+        slots[item.slot] = slots.get(item.slot, 0) + 1
+    assert len(sets) == prod(count + 1 for count in slots.values())
+    assert len({tuple(sorted(item.name for item in items)) for items in sets}) == len(sets)
+    assert all(len({item.slot for item in items}) == len(items) for items in sets)
+    assert [] in sets and sorted(EQUIPMENT_ITEMS.values(), key=id) in [sorted(s, key=id) for s in sets]
+
+
+def test_stats_add_the_equipment_bonuses():
+    sword, armor = EQUIPMENT_ITEMS["Long Sword"], EQUIPMENT_ITEMS["Leather Armor"]
+    player = player_stats([sword, armor])
+    assert player[HP] == PLAYER_HP
+    assert player[ATTACK] == PLAYER_ATTACK + sword.attack_bonus
+    assert player[DEFENSE] == PLAYER_DEFENSE + armor.defense_bonus
+    slime = Slime(0, 0)
+    assert enemy_stats(Slime)[:3].tolist() == [slime.hp, slime.attack, slime.defense]
@@ -0,0 +1,105 @@
+import random
+
+import numpy as np
+import pytest
+
+from combat import (AutoPolicy, Fighter, Initiative, damage, damage_distribution, expected_damage,
+                    kill_probability, melee, resolve, roll_damage, stats)
+
+
+class FixedRoll:
+    """randint が決まった値を返す乱数（damage() の出目を全部なめるため）"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def randint(self, low, high):
+        assert low <= self.value <= high
+        return self.value
+
+
+def every_roll(attack, defense):
+    low = max(1, attack // 2)
+    return [damage(attack, defense, FixedRoll(raw)) for raw in range(low, attack + 1)]
+
+
+@pytest.mark.parametrize("attack, defense", [(1, 0), (7, 21), (25, 21), (50, 80), (50, 120)])
+def test_roll_damage_uses_the_same_formula_as_damage(attack, defense):
+    rolls = every_roll(attack, defense)
+    values = sorted(set(rolls))
+    rolled = roll_damage(np.full(20000, attack), np.full(20000, defense), np.random.default_rng(0))
+    assert set(rolled.tolist()) <= set(values)
+    counts = [np.count_nonzero(rolled == v) / len(rolled) for v in values]
+    np.testing.assert_allclose(counts, [rolls.count(v) / len(rolls) for v in values], atol=0.02)
+
+
+def test_resolve_runs_each_fight_to_the_end():
+    # 一撃で倒せる方が勝つ。素早さが同じならプレイヤーが先に攻撃する
+    outcome = resolve(np.array([stats(10, 50, 0), stats(10, 1, 0)]), stats(5, 100, 0), 0)
+    assert outcome.won.tolist() == [True, False]
+    assert outcome.lost.tolist() == [False, True]
+    assert outcome.turns.tolist() == [1, 1]
+    fights = np.tile(stats(40, 20, 10), (500, 1))
+    first, again = resolve(stats(100, 10, 5), fights, 1), resolve(stats(100, 10, 5), fights, 1)
+    assert len(first) == 500
+    np.testing.assert_array_equal(first.player_hp, again.player_hp)
+    assert (first.won | first.lost).all()
+
+
+@pytest.mark.parametrize("attack", [1, 2, 7, 10, 25, 50])
+@pytest.mark.parametrize("defense", [0, 4, 15, 29, 80, 120])
+def test_distribution_matches_every_roll_of_damage(attack, defense):
+    rolls = every_roll(attack, defense)
+    values, probabilities = damage_distribution(attack, defense)
+    assert values == tuple(sorted(set(rolls)))
+    assert probabilities == pytest.approx([rolls.count(v) / len(rolls) for v in values])
+    assert expected_damage(attack, defense) == pytest.approx(sum(rolls) / len(rolls))
+    assert kill_probability(attack, defense, 1) == pytest.approx(1.0)
+    assert kill_probability(attack, defense, max(rolls) + 1) == 0
+
+
+def test_initiative_follows_speed_and_ties():
+    initiative = Initiative([("player", 5), ("slow", 3)])
+    assert "".join(initiative.next()[0] for _ in range(8)) == "psppspps"
+    initiative = Initiative([("a", 4), ("b", 4), ("fast", 8)])
+    assert [initiative.next() for _ in range(4)] == ["fast", "fast", "a", "b"]
+
+
+def test_empty_initiative_returns_none():
+    initiative = Initiative([("a", 3)])
+    initiative.remove("a")
+    assert initiative.next() is None
+    assert Initiative().next() is None
+
+
+def test_resolve_agrees_with_melee_on_turn_order():
+    # 素早さで勝つ側が入れ替わる組み合わせ。一括版と1戦ずつの版で勝率が揃う
+    for player_speed, enemy_speed in [(5, 3), (3, 5), (4, 4)]:
+        outcome = resolve(np.tile(stats(100, 10, 5, player_speed), (20000, 1)), stats(40, 20, 10, enemy_speed), 0)
+        rng = random.Random(0)
+        wins = sum(melee([Fighter("p", 100, 10, 5, player_speed)], [Fighter("e", 40, 20, 10, enemy_speed)],
+                         rng).winner == "players" for _ in range(4000))
+        assert outcome.won.mean() == pytest.approx(wins / 4000, abs=0.03)
+
+
+def test_auto_policy_rules():
+    assert AutoPolicy(heal_below=0.3).choose(29, 100, potions=1) == "heal"
+    assert AutoPolicy(heal_below=0.3).choose(30, 100, potions=1) == "attack"
+    assert AutoPolicy(heal_below=0.3).choose(10, 100, potions=0) == "attack"
+    assert AutoPolicy().choose(1, 100, potions=5) == "attack"
+    assert AutoPolicy(heal_risk=0.5).choose(90, 100, potions=1, risk=0.5) == "heal"
+    assert AutoPolicy(heal_risk=0.5).choose(90, 100, potions=1, risk=0.4) == "attack"
+
+
+def test_melee_spends_potions_through_the_policy():
+    player = Fighter("p", 40, 10, 5, 5)
+    result = melee([player], [Fighter("e", 200, 30, 20, 2)], random.Random(3),
+                   policy=AutoPolicy(heal_below=0.5), potions=2, heal=20)
+    assert result.potions_used == 2
+    assert result.winner == "enemies" and player.hp == 0
+    assert result.player_turns <= result.turns and 0 < result.dealt < 200
+
+
+def test_auto_policy_describes_its_rules():
+    assert AutoPolicy().describe() == "attack only"
+    assert AutoPolicy(heal_below=0.3, heal_risk=0.5).describe() == "heal: HP<30% or KO>=50%"
@@ -0,0 +1,49 @@
+import random
+
+import numpy as np
+import pytest
+
+from distance import PlayerDistanceField, bfs_distances
+from grid import WALL
+from maze import generate_maze
+
+
+def walk(grid, rng, steps):
+    """(1, 1) からランダムに歩いた座標の並び"""
+    x, y = 1, 1
+    path = [(x, y)]
+    for _ in range(steps):
+        moves = [(x + dx, y + dy) for dx, dy in ((0, -1), (1, 0), (0, 1), (-1, 0))
+                 if grid.is_walkable(x + dx, y + dy)]
+        x, y = rng.choice(moves)
+        path.append((x, y))
+    return path
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_incremental_field_matches_bfs_on_a_tree_maze(seed):
+    rng = random.Random(seed)
+    grid = generate_maze(21, 15, rng)
+    field = PlayerDistanceField(grid, 1, 1)
+    assert field.is_tree
+    for x, y in walk(grid, rng, 200):
+        field.move_to(x, y)
+        np.testing.assert_array_equal(field.field(), bfs_distances(grid, x, y))
+
+
+def test_field_with_loops_falls_back_to_bfs():
+    rng = random.Random(7)
+    grid = generate_maze(21, 15, rng)
+    # 壁を1枚抜いてループを作る
+    tiles = grid.tiles
+    ys, xs = np.nonzero(tiles[1:-1, 1:-1] == WALL)
+    for y, x in zip(ys + 1, xs + 1):
+        if tiles[y, x - 1] != WALL and tiles[y, x + 1] != WALL:
+            tiles[y, x] = 0
+            break
+    field = PlayerDistanceField(grid, 1, 1)
+    assert not field.is_tree
+    for x, y in walk(grid, rng, 50):
+        field.move_to(x, y)
+        assert field.distance(x, y) == 0
+        np.testing.assert_array_equal(field.field(), bfs_distances(grid, x, y))
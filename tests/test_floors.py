@@ -0,0 +1,69 @@
+import random
+
+import numpy as np
+import pytest
+
+from floors import ExploredMap, FloorCache, floor_rng
+from maze import generate_maze
+
+
+def build(run_seed, index):
+    """ゲームの build_floor と同じく、迷路を掘ったあと同じ乱数で配置を引く"""
+    rng = floor_rng(run_seed, index)
+    grid = generate_maze(21, 15, rng)
+    return grid, [rng.randint(2, 19) for _ in range(12)]
+
+
+def test_cache_drops_the_least_recently_used_floor():
+    cache = FloorCache(2)
+    cache.put(-1, "a")
+    cache.put(-2, "b")
+    assert cache.get(-1) == "a"  # -1 の方が最近使ったことになる
+    cache.put(-3, "c")
+    assert len(cache) == 2
+    assert -1 in cache and -3 in cache and -2 not in cache
+    assert cache.get(-2) is None
+
+
+@pytest.mark.parametrize("run_seed", [0, 1, 2 ** 64 - 1])
+def test_evicted_floor_is_rebuilt_from_the_seed(run_seed):
+    cache = FloorCache(1)
+    first = build(run_seed, -1)
+    cache.put(-1, first)
+    cache.put(-2, build(run_seed, -2))
+    assert cache.get(-1) is None
+    grid, placements = build(run_seed, -1)
+    assert grid == first[0] and placements == first[1]
+    assert build(run_seed, -2)[0] != first[0]
+    assert build(run_seed + 1, -1)[0] != first[0]
+
+
+def test_explored_map_round_trips_through_bytes():
+    explored = ExploredMap(21, 15)
+    rng = random.Random(0)
+    cells = {(rng.randrange(21), rng.randrange(15)) for _ in range(60)}
+    for x, y in cells:
+        explored.reveal(x, y)
+    assert explored.count() == len(cells)
+    data = explored.to_bytes()
+    assert len(data) == (21 * 15 + 7) // 8
+    copy = ExploredMap.from_bytes(21, 15, data)
+    assert all(copy.is_explored(x, y) == ((x, y) in cells) for y in range(15) for x in range(21))
+    assert copy.count() == len(cells)
+    with pytest.raises(ValueError):
+        ExploredMap.from_bytes(21, 15, data[:-1])
+
+
+def test_explored_map_counts_each_cell_once():
+    explored = ExploredMap(10, 6)
+    explored.reveal_rect(-2, -2, 2, 1)  # 範囲外は切り捨て
+    explored.reveal_rect(1, 0, 3, 0)
+    explored.reveal(0, 0)
+    assert explored.count() == 3 * 2 + 1
+    mask = np.zeros((6, 10), dtype=bool)
+    mask[5, 9] = mask[0, 0] = True
+    explored.reveal_mask(mask)
+    assert explored.count() == 8
+    assert explored.to_mask().sum() == 8 and explored.to_mask()[5, 9]
+    explored.reveal_all()
+    assert explored.count() == 60 and explored.ratio() == 1.0
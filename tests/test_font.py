@@ -0,0 +1,23 @@
+from font import BUILTIN_HEIGHT, BUILTIN_WIDTH, FONT_HEIGHT, TextCache
+
+
+def test_text_cache_drops_the_least_recently_used_text():
+    cache = TextCache(capacity=2)
+    hp = cache.image("HP", 7)
+    cache.image("MP", 7)
+    assert cache.image("HP", 7) is hp
+    cache.image("ゴールド", 7)  # HP を使ったので MP が追い出される
+    assert len(cache) == 2
+    assert ("HP", 7) in cache.images and ("MP", 7) not in cache.images
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert cache.image("HP", 8) is not hp  # 色が違えば別の画像
+    assert cache.misses == 4
+
+
+def test_text_cache_sizes_images_by_font():
+    cache = TextCache()
+    image, colkey = cache.image("HP 10\nMP 5", 7)
+    assert (image.width, image.height) == (5 * BUILTIN_WIDTH, 2 * BUILTIN_HEIGHT)
+    assert colkey != 7
+    image, _ = cache.image("たたかう", 7)
+    assert image.height == FONT_HEIGHT and image.width == cache.font.text_width("たたかう")
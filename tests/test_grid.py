@@ -0,0 +1,99 @@
+import random
+
+import numpy as np
+import pytest
+
+from grid import DOWN_STAIRS, FLOOR, UP_STAIRS, WALL, CellSampler, DungeonGrid
+from maze import generate_maze
+
+TILE_CHARS = {"#": WALL, ".": FLOOR, "<": UP_STAIRS, ">": DOWN_STAIRS}
+
+
+def parse(*rows):
+    return DungeonGrid.from_rows([[TILE_CHARS[c] for c in row] for row in rows])
+
+
+def random_grid(seed, width=23, height=17):
+    """迷路の壁をさらにランダムに抜いたマップ（ループも広間もできる）"""
+    rng = random.Random(seed)
+    grid = generate_maze(width, height, rng)
+    for y in range(1, height - 1):
+        for x in range(1, width - 1):
+            if grid.tiles[y, x] == WALL and rng.random() < 0.3:
+                grid.tiles[y, x] = FLOOR
+    return grid
+
+
+def test_rows_and_bytes_round_trip():
+    rows = [[WALL, WALL, WALL], [WALL, UP_STAIRS, FLOOR], [WALL, DOWN_STAIRS, WALL]]
+    grid = DungeonGrid.from_rows(rows)
+    assert grid.to_rows() == rows
+    assert (grid.width, grid.height, len(grid)) == (3, 3, 3)
+    assert grid[1][2] == FLOOR and grid.tile(1, 2) == DOWN_STAIRS
+    assert DungeonGrid.from_bytes(bytes(sum(rows, [])), 3, 3) == grid
+    assert grid.find(UP_STAIRS) == (1, 1) and grid.find(7) is None
+    assert grid.is_walkable(2, 1) and not grid.is_walkable(0, 0) and not grid.is_walkable(3, 1)
+    assert grid.tile_counts().tolist() == [1, 6, 1, 1]
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("diagonal", [False, True])
+def test_neighbour_counts_match_a_loop(seed, diagonal):
+    grid = random_grid(seed)
+    offsets = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+    if diagonal:
+        offsets += [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+    expected = [[sum(grid.is_walkable(x + dx, y + dy) for dx, dy in offsets) for x in range(grid.width)]
+                for y in range(grid.height)]
+    assert grid.neighbour_counts(diagonal).tolist() == expected
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_wall_distance_is_the_walk_to_the_nearest_wall(seed):
+    grid = random_grid(seed)
+    walls = [(x, y) for y in range(grid.height) for x in range(grid.width) if not grid.is_walkable(x, y)]
+    dist = grid.wall_distance()
+    for y in range(grid.height):
+        for x in range(grid.width):
+            # 外周の外も壁として数える
+            edge = min(x + 1, y + 1, grid.width - x, grid.height - y)
+            nearest = min([abs(x - wx) + abs(y - wy) for wx, wy in walls] + [edge])
+            assert dist[y, x] == nearest
+
+
+def test_wall_distance_of_an_open_room():
+    grid = parse(".....", ".....", ".....")
+    assert grid.wall_distance().tolist() == [[1, 1, 1, 1, 1], [1, 2, 2, 2, 1], [1, 1, 1, 1, 1]]
+
+
+def test_rewrite_maps_tiles_inside_the_mask():
+    grid = parse("#<.>#", "#...#")
+    grid.rewrite({UP_STAIRS: FLOOR, DOWN_STAIRS: FLOOR})
+    assert grid == parse("#...#", "#...#")
+    mask = np.zeros((2, 5), dtype=bool)
+    mask[0] = True
+    grid.rewrite({FLOOR: WALL, WALL: FLOOR}, mask)
+    assert grid == parse(".###.", "#...#")
+
+
+def test_open_cells_skip_stairs_and_the_excluded_area():
+    grid = parse("#######", "#<....#", "#.....#", "#....>#", "#######")
+    cells = grid.open_cells()
+    assert all(grid.tile(i % 7, i // 7) == FLOOR for i in cells)
+    assert len(cells) == 13
+    near = grid.open_cells(exclude=[(1, 1)], radius=2)
+    assert all(max(abs(i % 7 - 1), abs(i // 7 - 1)) > 2 for i in near)
+    assert sorted(near.tolist()) == [1 * 7 + 4, 1 * 7 + 5, 2 * 7 + 4, 2 * 7 + 5, 3 * 7 + 4]
+
+
+def test_sampler_draws_every_cell_once():
+    grid = random_grid(0)
+    cells = grid.open_cells()
+    sampler = CellSampler(cells, grid.width, random.Random(0))
+    picks = sampler.sample_many(10)
+    assert len(sampler) == len(cells) - 10
+    while len(sampler):
+        picks.append(sampler.sample())
+    assert sampler.sample() is None
+    assert sampler.sample_many(3) == []
+    assert sorted(y * grid.width + x for x, y in picks) == sorted(cells.tolist())
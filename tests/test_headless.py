@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import headless
+
+# headless.scenario() の入力で回したときの画面のチェックサム。描画やゲームの進行を変えたら
+# python wiz/headless.py <フレーム数> <種> [instant] で出る値に更新する
+RECORDED_DIGESTS = {
+    (300, 0, False): 0x63ffbdfb,
+    (300, 1, False): 0x399c01e2,
+    (300, 0, True): 0xb81256ca,
+    (300, 1, True): 0x418aee0a,
+}
+
+
+def test_text_matches_the_builtin_font():
+    s = "HP 10/10 > Attack!"
+    real = headless._pyxel.Image(len(s) * 4, 6)
+    real.cls(0)
+    real.text(0, 0, s, 7)
+    image = headless.Image(len(s) * 4, 6)
+    image.text(0, 0, s, 7)
+    assert image.data.tolist() == [[real.pget(x, y) for x in range(real.width)] for y in range(6)]
+
+
+def test_blt_skips_the_colour_key_and_clips():
+    src = headless.Image(4, 4)
+    src.cls(3)
+    src.rect(1, 1, 2, 2, 9)
+    dst = headless.Image(6, 6)
+    dst.cls(1)
+    dst.blt(4, 4, src, 0, 0, 4, 4, 3)  # 右下にはみ出した分は捨てる
+    assert dst.data[5, 5] == 9 and dst.data[4, 4] == 1
+    dst.clip(0, 0, 2, 2)
+    dst.blt(0, 0, src, 0, 0, 4, 4)
+    dst.clip()
+    assert dst.data[:2, :2].tolist() == [[3, 3], [3, 9]] and dst.data[2, 2] == 1
+    assert np.count_nonzero(dst.data == 9) == 2
+
+
+def run(frames, seed, instant=False):
+    headless.load_game(headless.GAME_FILE, seed)
+    headless.game().instant_battles = instant
+    return headless.play(frames)
+
+
+def test_same_seed_gives_the_same_frames():
+    assert run(300, 2) == run(300, 2)
+
+
+@pytest.mark.parametrize("instant", [False, True])
+@pytest.mark.parametrize("seed", range(3))
+def test_scenario_visits_every_screen(seed, instant):
+    headless.load_game(headless.GAME_FILE, seed)
+    app = headless.game()
+    app.instant_battles = instant
+    seen = set()
+    for keys in headless.scenario(app):
+        headless.step(*keys)
+        seen.update(name for name, shown in [
+            ("menu", app.show_menu), ("automap", app.show_automap), ("first_person", app.first_person),
+            ("profiler", app.profiler.visible), ("battle", app.in_battle), ("chest", app.chest_state),
+        ] if shown)
+        if app.show_automap:
+            seen.add(("zoom", app.automap_level))
+        if app.in_battle and app.battle_command == headless.BATTLE_AUTO:
+            seen.add("auto")
+    expected = {"menu", "automap", "first_person", "profiler", "chest"}
+    expected |= {("zoom", level) for level in range(len(app.automap.levels))}
+    if not instant:
+        expected |= {"battle", "auto"}
+    assert expected <= seen
+    assert not app.profiler.visible
+    # 戦闘は（instant でも）決着していて、倒した敵はフロアから消えている
+    assert not app.in_battle
+    assert app.floor_state.removed_enemies
+    assert not any(enemy.spawn_id in app.floor_state.removed_enemies for enemy in app.enemies)
+
+
+def test_instant_battles_change_the_frames():
+    assert run(300, 0) != run(300, 0, instant=True)
+
+
+def test_recorded_digests():
+    for (frames, seed, instant), digest in RECORDED_DIGESTS.items():
+        assert run(frames, seed, instant) == digest, (frames, seed, instant)
@@ -0,0 +1,165 @@
+import random
+from collections import deque
+
+import pytest
+
+import maze as maze_module
+from grid import DOWN_STAIRS, FLOOR, UP_STAIRS, WALL
+from maze import (EndlessMaze, carve_maze, eller_rows, generate_maze, reachable_cells, repair_reachability,
+                  unreachable_targets)
+
+
+def open_graph(rows):
+    """壁以外のマスの数・隣り合う通路の組の数・区画（つながったマスの集合）の一覧"""
+    height, width = len(rows), len(rows[0])
+    cells = {(x, y) for y in range(height) for x in range(width) if rows[y][x] != WALL}
+    edges = sum((x + 1, y) in cells for x, y in cells) + sum((x, y + 1) in cells for x, y in cells)
+    regions = []
+    seen = set()
+    for start in sorted(cells):
+        if start in seen:
+            continue
+        seen.add(start)
+        region = {start}
+        queue = deque([start])
+        while queue:
+            x, y = queue.popleft()
+            for n in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if n in cells and n not in seen:
+                    seen.add(n)
+                    region.add(n)
+                    queue.append(n)
+        regions.append(region)
+    return len(cells), edges, regions
+
+
+@pytest.mark.parametrize("width, height", [(21, 15), (5, 5), (101, 61)])
+def test_carved_maze_is_a_single_tree(width, height):
+    cells = carve_maze(width, height, random.Random(width))
+    rows = [cells[y * width:(y + 1) * width] for y in range(height)]
+    count, edges, regions = open_graph(rows)
+    assert len(regions) == 1
+    assert edges == count - 1  # ループがない
+    # 奇数の大きさなら部屋のマス（奇数座標）は全部掘られている
+    assert all(rows[y][x] == FLOOR for y in range(1, height, 2) for x in range(1, width, 2))
+
+
+def test_generate_maze_places_both_stairs():
+    grid = generate_maze(21, 15, random.Random(0))
+    assert grid[1][19] == UP_STAIRS
+    assert grid[13][19] == DOWN_STAIRS
+
+
+def test_same_rng_gives_the_same_maze():
+    assert carve_maze(41, 41, random.Random(5)) == carve_maze(41, 41, random.Random(5))
+    assert carve_maze(41, 41, random.Random(5)) != carve_maze(41, 41, random.Random(6))
+
+
+def stream(width, rng, count):
+    rows = eller_rows(width, rng)
+    return [next(rows) for _ in range(count)]
+
+
+@pytest.mark.parametrize("width", [5, 21, 63])
+@pytest.mark.parametrize("seed", range(3))
+def test_eller_rows_have_no_loops_and_no_closed_regions(width, seed):
+    # 終わりのない迷路なので、先頭の窓の中で「ループがない」「どの区画も窓の下端まで続いている」を確かめる
+    rows = stream(width, random.Random(seed), 401)
+    count, edges, regions = open_graph(rows)
+    assert edges == count - len(regions)
+    bottom = len(rows) - 1
+    assert all(any(y == bottom for _, y in region) for region in regions)
+    # 外周の壁（1行目と左右の列）は掘らない
+    assert all(tile == WALL for tile in rows[0])
+    assert all(row[0] == WALL and row[-1] == WALL for row in rows)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_eller_rows_connect_the_top_of_the_window(seed):
+    rows = stream(21, random.Random(seed), 401)
+    _, _, regions = open_graph(rows)
+    top = [region for region in regions if any(y <= 20 for _, y in region)]
+    assert len(top) == 1
+
+
+def test_endless_maze_keeps_a_bounded_number_of_rows():
+    maze = EndlessMaze(31, random.Random(0), keep=16)
+    assert maze[1][29] == UP_STAIRS
+    for y in range(1, 5000):
+        maze.row(y)
+        maze.trim(y)
+        assert len(maze.rows) <= maze.keep + 2
+    assert maze.top > 4900
+    with pytest.raises(IndexError):
+        maze.row(0)
+    assert not maze.is_walkable(1, 1)  # 捨てた行は壁扱い
+
+
+@pytest.mark.parametrize("width", [0, 1, 2, 4, 32])
+def test_eller_rows_reject_widths_without_a_right_wall(width):
+    with pytest.raises(ValueError):
+        eller_rows(width)
+    with pytest.raises(ValueError):
+        EndlessMaze(width)
+
+
+@pytest.mark.parametrize("width, height", [(16, 16), (17, 13), (5, 5), (40, 24)])
+@pytest.mark.parametrize("seed", range(5))
+def test_generated_maze_reaches_both_stairs(width, height, seed):
+    grid = generate_maze(width, height, random.Random(seed))
+    cells = bytearray(grid.tiles.tobytes())
+    stairs = [grid.find(UP_STAIRS), grid.find(DOWN_STAIRS)]
+    assert None not in stairs
+    targets = [y * width + x for x, y in stairs]
+    assert unreachable_targets(cells, width, height, width + 1, targets) == []
+
+
+def test_stairs_next_to_a_detached_corridor_are_connected(monkeypatch):
+    # 下り階段の隣は通路だが、その通路は入口の区画とつながっていない
+    rows = [
+        "#######",
+        "#...###",
+        "#######",
+        "#######",
+        "#####.#",
+        "#######",
+        "#######",
+    ]
+    monkeypatch.setattr(maze_module, "carve_maze",
+                        lambda width, height, rng: bytearray(WALL if c == "#" else FLOOR for row in rows for c in row))
+    grid = generate_maze(7, 7, random.Random(0))
+    cells = bytearray(grid.tiles.tobytes())
+    assert grid.tile(5, 5) == DOWN_STAIRS and grid.tile(5, 1) == UP_STAIRS
+    assert unreachable_targets(cells, 7, 7, 8, [5 * 7 + 5, 7 + 5]) == []
+
+
+@pytest.mark.parametrize("width, height", [(1, 1), (3, 3), (4, 9), (9, 4)])
+def test_generate_maze_rejects_maps_without_room_for_stairs(width, height):
+    with pytest.raises(ValueError):
+        generate_maze(width, height, random.Random(0))
+
+
+def test_carved_corridors_are_reachable():
+    width, height = 21, 15
+    cells = carve_maze(width, height, random.Random(1))
+    reached = reachable_cells(cells, width, height, width + 1)
+    assert all(reached[i] for i, cell in enumerate(cells) if cell != WALL)
+
+
+def test_repair_digs_the_fewest_walls():
+    # 左右の部屋が壁3枚で隔てられている。右の部屋へは3マス掘ればつながる
+    rows = [
+        "#########",
+        "#..###..#",
+        "#..###..#",
+        "#########",
+    ]
+    width, height = len(rows[0]), len(rows)
+    cells = bytearray(WALL if c == "#" else FLOOR for row in rows for c in row)
+    target = 1 * width + 7
+    assert unreachable_targets(cells, width, height, width + 1, [target]) == [target]
+    assert repair_reachability(cells, width, height, width + 1, [target]) == 3
+    assert unreachable_targets(cells, width, height, width + 1, [target]) == []
+    # 外周の壁は掘らない
+    assert all(cells[i] == WALL for i in range(width))
+    assert all(cells[(height - 1) * width + x] == WALL for x in range(width))
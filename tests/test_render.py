@@ -0,0 +1,139 @@
+import random
+
+import numpy as np
+import pyxel
+import pytest
+
+import render
+from floors import ExploredMap
+from maze import generate_maze
+from render import AUTOMAP_COLORS, AUTOMAP_TILES, CHUNK_CELLS, TILE_COLORS, AutoMap, Camera, FloorImage
+
+TILE = 4
+
+
+def pixels(image, width, height, step=1):
+    """image の左上 width x height を step ごとに読んだ色番号"""
+    return np.array([[image.pget(x, y) for x in range(0, width, step)] for y in range(0, height, step)])
+
+
+def explore(explored, rng, count):
+    """ランダムな矩形をいくつか判明にする"""
+    for _ in range(count):
+        x, y = rng.randrange(explored.width), rng.randrange(explored.height)
+        explored.reveal_rect(x - 2, y - 2, x + 2, y + 2)
+
+
+def floor_pixel(view, x, y):
+    chunk = view.chunks.get((x // CHUNK_CELLS, y // CHUNK_CELLS))
+    return 0 if chunk is None else chunk.pget(x % CHUNK_CELLS * TILE, y % CHUNK_CELLS * TILE)
+
+
+def test_floor_image_follows_exploration():
+    rng = random.Random(0)
+    grid = generate_maze(41, 37, rng)
+    explored = ExploredMap(grid.width, grid.height)
+    view = FloorImage(grid, explored, TILE)
+    for _ in range(4):
+        explore(explored, rng, 5)
+        view.sync()
+        for y in range(grid.height):
+            for x in range(grid.width):
+                expected = TILE_COLORS[grid.tile(x, y)] if explored.is_explored(x, y) else 0
+                assert floor_pixel(view, x, y) == expected, (x, y)
+
+
+def test_camera_stops_at_the_map_edges():
+    camera = Camera(10, 8, 40, 30)
+    camera.follow(1, 1)
+    assert (camera.x, camera.y) == (0, 0)
+    camera.follow(20, 15)
+    assert (camera.x, camera.y) == (15, 11)
+    assert camera.visible_rect() == (15, 11, 24, 18)
+    assert camera.is_visible(24, 18) and not camera.is_visible(25, 18)
+    camera.follow(39, 29)
+    assert (camera.x, camera.y) == (30, 22)
+    assert camera.to_screen(31, 23, TILE) == (TILE, TILE)
+    small = Camera(10, 8, 6, 5)
+    small.follow(5, 4)
+    assert (small.x, small.y) == (0, 0) and small.visible_rect() == (0, 0, 5, 4)
+
+
+def test_floor_image_draws_only_visible_chunks(monkeypatch):
+    grid = generate_maze(101, 101, random.Random(1))
+    explored = ExploredMap(grid.width, grid.height)
+    explored.reveal_all()
+    view = FloorImage(grid, explored, TILE)
+    drawn = []
+    monkeypatch.setattr(pyxel, "blt", lambda x, y, image, *args: drawn.append((x, y)))
+    camera = Camera(20, 15, grid.width, grid.height)
+    camera.follow(50, 50)
+    view.draw(camera)
+    size = CHUNK_CELLS * TILE
+    assert 1 <= len(drawn) <= 4
+    assert all(-size < x < 20 * TILE and -size < y < 15 * TILE for x, y in drawn)
+
+
+def expected_automap(explored, grid, scale):
+    rank = {tile: i for i, tile in enumerate(AUTOMAP_TILES)}
+    ranks = np.where(explored.to_mask(), np.vectorize(rank.get)(grid.tiles), 0)
+    if scale >= 1:
+        ranks = np.kron(ranks, np.ones((scale, scale), dtype=ranks.dtype))
+    else:
+        step = round(1 / scale)
+        h, w = -(-grid.height // step), -(-grid.width // step)
+        ranks = np.array([[ranks[y * step:(y + 1) * step, x * step:(x + 1) * step].max() for x in range(w)]
+                          for y in range(h)])
+    return np.array(AUTOMAP_COLORS)[ranks]
+
+
+SMALL_LEVELS = [i for i, scale in enumerate(render.ZOOM_LEVELS) if scale <= 1]
+ZOOMED_LEVELS = [i for i, scale in enumerate(render.ZOOM_LEVELS) if scale > 1]
+
+
+@pytest.mark.parametrize("level", SMALL_LEVELS)
+def test_automap_images_follow_exploration(level):
+    rng = random.Random(level)
+    grid = generate_maze(37, 29, rng)
+    explored = ExploredMap(grid.width, grid.height)
+    automap = AutoMap(grid, explored)
+    explore(explored, rng, 3)
+    image = automap.image(level)  # この縮尺の画像を作ってから、さらに探索を進める
+    for _ in range(3):
+        explore(explored, rng, 3)
+        automap.sync()
+        expected = expected_automap(explored, grid, render.ZOOM_LEVELS[level])
+        assert (pixels(image, expected.shape[1], expected.shape[0]) == expected).all()
+
+
+@pytest.mark.parametrize("level", ZOOMED_LEVELS)
+def test_zoomed_automap_shows_the_window_only(level):
+    rng = random.Random(level)
+    grid = generate_maze(37, 29, rng)
+    explored = ExploredMap(grid.width, grid.height)
+    automap = AutoMap(grid, explored)
+    scale = render.ZOOM_LEVELS[level]
+    for _ in range(6):
+        explore(explored, rng, 2)
+        # 枠の端がマスの途中にかかる位置も試す
+        u, v = rng.randrange(grid.width * scale - 50), rng.randrange(grid.height * scale - 30)
+        image = automap.zoomed_image(level, u, v, 50, 30)
+        expected = expected_automap(explored, grid, scale)[v:v + 30, u:u + 50]
+        assert (image.width, image.height) == (50, 30)
+        assert (pixels(image, 50, 30) == expected).all()
+
+
+def test_zoomed_automap_keeps_no_whole_floor_image(monkeypatch):
+    grid = generate_maze(101, 101, random.Random(2))
+    explored = ExploredMap(grid.width, grid.height)
+    explored.reveal_all()
+    automap = AutoMap(grid, explored)
+    drawn = []
+    monkeypatch.setattr(pyxel, "blt", lambda x, y, image, u, v, w, h, *args: drawn.append((image, u, v, w, h)))
+    automap.draw(0, 0, 64, 48, 0, 50, 50)
+    assert automap.images == {}
+    assert drawn == [(automap.zoomed, 0, 0, 64, 48)]
+    assert (automap.zoomed.width, automap.zoomed.height) == (64, 48)
+    key = automap.zoomed_key
+    automap.draw(0, 0, 64, 48, 0, 50, 50)  # 同じ位置で何も判明していなければ作り直さない
+    assert automap.zoomed_key == key == (0, 50 * 8 + 4 - 32, 50 * 8 + 4 - 24, 64, 48)
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from spatial import SpatialIndex
+
+
+def scatter(count, size, seed):
+    rng = random.Random(seed)
+    index = SpatialIndex()
+    for i in range(count):
+        index.add(f"e{i}", rng.randrange(size), rng.randrange(size))
+    return index
+
+
+def test_add_move_and_remove():
+    index = SpatialIndex()
+    index.add("slime", 3, 4)
+    index.add("chest", 3, 4)
+    assert index.at(3, 4) == ["slime", "chest"]
+    assert index.first_at(3, 4) == "slime"
+    index.move("slime", 5, 4)
+    assert index.at(3, 4) == ["chest"] and index.position("slime") == (5, 4)
+    index.add("chest", 6, 6)  # 登録済みなら移動になる
+    assert index.first_at(3, 4) is None and len(index) == 2
+    index.remove("slime")
+    index.discard("slime")
+    assert "slime" not in index and list(index) == ["chest"]
+    assert index.cells == {(6, 6): {"chest": None}}
+
+
+# 半径が小さいと周りのマスを、大きいと登録マスを調べる。どちらでも総当たりと同じ結果になる
+@pytest.mark.parametrize("radius", [0, 1, 3, 8, 40])
+def test_within_matches_a_scan(radius):
+    index = scatter(80, 30, radius)
+    for x, y in [(0, 0), (15, 15), (29, 3)]:
+        expected = {e for e in index
+                    if abs(index.position(e)[0] - x) <= radius and abs(index.position(e)[1] - y) <= radius}
+        found = index.within(x, y, radius)
+        assert len(found) == len(set(found))
+        assert set(found) == expected
+
+
+@pytest.mark.parametrize("rect", [(0, 0, 0, 0), (2, 5, 9, 7), (10, 0, 29, 29), (-5, -5, 40, 40)])
+def test_in_rect_matches_a_scan(rect):
+    index = scatter(80, 30, 1)
+    x0, y0, x1, y1 = rect
+    expected = {e for e in index if x0 <= index.position(e)[0] <= x1 and y0 <= index.position(e)[1] <= y1}
+    found = index.in_rect(*rect)
+    assert len(found) == len(set(found))
+    assert set(found) == expected
@@ -0,0 +1,51 @@
+import pyxel
+import pytest
+
+import ui
+
+
+def make_panel():
+    return ui.Panel(0, 0, 40, 20, {"hp": ui.Bar(2, 2, 30, 3, ratio=1.0, color=11, back_color=8),
+                                   "name": ui.Label(2, 8, "Slime")})
+
+
+def test_panel_redraws_only_when_a_child_changes(monkeypatch):
+    blits = []
+    monkeypatch.setattr(pyxel, "blt", lambda *args: blits.append(args))
+    panel = make_panel()
+    panel.draw()
+    panel.draw()
+    assert panel.redraws == 1 and len(blits) == 2  # 描き直さなくても毎フレーム貼る
+    assert panel.image.pget(31, 2) == 11
+    panel.set(hp={"ratio": 1.0})  # 同じ値なら dirty にならない
+    panel.draw()
+    assert panel.redraws == 1
+    panel.set(hp={"ratio": 0.5})
+    panel.draw()
+    assert panel.redraws == 2 and panel.image.pget(31, 2) == 8
+    panel["name"].set(text="Goblin")
+    panel.draw()
+    assert panel.redraws == 3
+    panel.visible = False
+    panel["name"].set(text="Dragon")
+    panel.draw()
+    assert panel.redraws == 3 and len(blits) == 5
+    panel.visible = True
+    panel.draw()
+    assert panel.redraws == 4
+
+
+def test_hidden_child_is_not_drawn(monkeypatch):
+    monkeypatch.setattr(pyxel, "blt", lambda *args: None)
+    panel = make_panel()
+    panel["hp"].set(visible=False)
+    panel.draw()
+    assert panel.image.pget(2, 2) == panel.bg
+
+
+def test_widget_without_render_cannot_be_created():
+    class Broken(ui.Widget):
+        pass
+
+    with pytest.raises(TypeError):
+        Broken(0, 0)
@@ -0,0 +1,81 @@
+"""敵の種類 x 装備の組み合わせごとに戦闘を回して勝率などを出す
+
+python balance.py [1組あたりの戦闘数] [種] [プロセス数]
+"""
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from combat import resolve, stats
+from units import ENEMY_TYPES, EQUIPMENT_ITEMS, PLAYER_ATTACK, PLAYER_DEFENSE, PLAYER_HP, PLAYER_SPEED
+
+CHUNK_FIGHTS = 200_000  # 1回の resolve() に渡す戦闘数（プロセスに配る単位）
+
+
+def loadouts():
+    """装備スロットごとに「なし」か装備品1つを選んだ全組み合わせ"""
+    slots = {}
+    for item in EQUIPMENT_ITEMS.values():
+        slots.setdefault(item.slot, [None]).append(item)
+    return [[item for item in choice if item] for choice in itertools.product(*slots.values())]
+
+
+def player_stats(items):
+    attack = PLAYER_ATTACK + sum(item.attack_bonus for item in items)
+    defense = PLAYER_DEFENSE + sum(item.defense_bonus for item in items)
+    return stats(PLAYER_HP, attack, defense, PLAYER_SPEED)
+
+
+def enemy_stats(enemy_class):
+    enemy = enemy_class(0, 0)
+    return stats(enemy.hp, enemy.attack, enemy.defense, enemy.speed)
+
+
+def simulate(task):
+    """(組の番号, プレイヤー, 敵, 戦闘数, 種) を回して合計を返す（プロセスプールで実行）"""
+    pair, player, enemy, fights, seed = task
+    outcome = resolve(player, np.tile(enemy, (fights, 1)), np.random.default_rng(seed))
+    hp_lost = int(player[0] * fights - outcome.player_hp.sum())
+    return pair, fights, int(outcome.won.sum()), int(outcome.turns.sum()), hp_lost
+
+
+def tasks(pairs, fights, seed):
+    """組ごとの戦闘を CHUNK_FIGHTS ずつに分け、それぞれに別の種を付ける"""
+    chunks = []
+    for pair, (player, enemy) in enumerate(pairs):
+        for start in range(0, fights, CHUNK_FIGHTS):
+            chunks.append((pair, player, enemy, min(CHUNK_FIGHTS, fights - start)))
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    return [chunk + (s,) for chunk, s in zip(chunks, seeds)]
+
+
+def main(argv):
+    fights = int(argv[1]) if len(argv) > 1 else 10_000
+    seed = int(argv[2]) if len(argv) > 2 else 0
+    workers = int(argv[3]) if len(argv) > 3 else os.cpu_count()
+    sets = loadouts()
+    rows = [(enemy_class, items) for enemy_class in ENEMY_TYPES for items in sets]
+    pairs = [(player_stats(items), enemy_stats(enemy_class)) for enemy_class, items in rows]
+    totals = np.zeros((len(rows), 4), dtype=np.int64)  # 戦闘数・勝ち数・手番数・失った HP
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        for pair, *sums in pool.map(simulate, tasks(pairs, fights, seed), chunksize=4):
+            totals[pair] += sums
+    elapsed = time.perf_counter() - start
+
+    print(f"{'enemy':<10} {'loadout':<55} {'win%':>6} {'turns':>6} {'hp lost':>7} {'gold/turn':>9}")
+    for (enemy_class, items), (count, wins, turns, hp_lost) in zip(rows, totals):
+        gold = enemy_class(0, 0).gold
+        loadout = "+".join(item.name for item in items) or "-"
+        print(f"{enemy_class.__name__:<10} {loadout:<55} {wins / count:>6.1%} {turns / count:>6.2f} "
+              f"{hp_lost / count:>7.1f} {gold * wins / turns:>9.2f}")
+    total = int(totals[:, 0].sum())
+    print(f"{total} fights in {elapsed:.1f}s ({total / elapsed:.0f} fights/s, {workers} processes)")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,258 @@
+import heapq
+import itertools
+import random
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+# 能力値配列の列（stats() で作る。複数の戦闘は (戦闘数, 4) の配列にまとめる）
+HP, ATTACK, DEFENSE, SPEED = range(4)
+MAX_REDUCTION = 0.8  # 防御で減らせるダメージの上限（80%カット）
+MAX_TURNS = 2000  # resolve()・melee() でこの手番数までに決着がつかなければ引き分け
+TURN_LENGTH = 5040  # 素早さ 1 の者の手番の間隔（1〜10 のどれでも割り切れる数）
+
+
+def stats(hp, attack, defense, speed=0):
+    return np.array([hp, attack, defense, speed], dtype=np.int64)
+
+
+def reduce_damage(raw_damage, defense):
+    """防御力 1 につき 1% 減らしたダメージ（最低 1）"""
+    return max(1, int(raw_damage * (1 - min(MAX_REDUCTION, defense / 100))))
+
+
+def damage(attack, defense, rng=random):
+    """1回分のダメージ。攻撃力の半分〜攻撃力を振り、reduce_damage() で減らす"""
+    return reduce_damage(rng.randint(max(1, attack // 2), attack), defense)
+
+
+@lru_cache(maxsize=None)
+def damage_distribution(attack, defense):
+    """damage() が返しうる値とその確率 ((値, ...), (確率, ...))。(attack, defense) ごとに1回だけ数える"""
+    low = max(1, attack // 2)
+    counts = Counter(reduce_damage(raw_damage, defense) for raw_damage in range(low, attack + 1))
+    values = tuple(sorted(counts))
+    return values, tuple(counts[value] / (attack - low + 1) for value in values)
+
+
+def precompute_damage_tables(max_attack, max_defense):
+    """攻撃力 1〜max_attack、防御力 0〜max_defense の分布を先に全部数えておく"""
+    for attack in range(1, max_attack + 1):
+        for defense in range(max_defense + 1):
+            damage_distribution(attack, defense)
+
+
+def expected_damage(attack, defense):
+    return sum(value * p for value, p in zip(*damage_distribution(attack, defense)))
+
+
+def kill_probability(attack, defense, hp):
+    """1回の攻撃で残り hp を削りきる確率"""
+    return sum(p for value, p in zip(*damage_distribution(attack, defense)) if value >= hp)
+
+
+def turn_delay(speed):
+    """素早さ speed の者が次の手番までに待つ時間"""
+    return TURN_LENGTH // max(1, speed)
+
+
+def roll_damage(attack, defense, rng):
+    """damage() の配列版。attack と defense の要素ごとに1回ずつ振る（rng は np.random.Generator）"""
+    attack = np.asarray(attack)
+    raw_damage = rng.integers(np.maximum(1, attack // 2), attack, endpoint=True)
+    reduction = np.minimum(MAX_REDUCTION, np.asarray(defense) / 100)
+    return np.maximum(1, (raw_damage * (1 - reduction)).astype(np.int64))
+
+
+class Initiative:
+    """素早さで手番が回ってくる行動順（ヒープ）
+
+    素早さ s の者には turn_delay(s) ごとに手番が来る。同じ時刻なら素早い方、それも同じなら先に加えた方が先。
+    next() と add() は O(log n)。remove() は印を付けるだけで、印の付いた項目はヒープの先頭に来たときに捨てる。
+    """
+
+    def __init__(self, actors=()):
+        self.heap = []  # [手番の時刻, -素早さ, 加えた順, 行動者]
+        self.entries = {}  # 行動者 -> ヒープ内の項目
+        self.order = itertools.count()
+        self.time = 0  # 最後に手番が来た時刻
+        for actor, speed in actors:
+            self.add(actor, speed)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, actor):
+        return actor in self.entries
+
+    def add(self, actor, speed):
+        """actor を加える（最初の手番は今から turn_delay(speed) 後）"""
+        self.remove(actor)
+        entry = [self.time + turn_delay(speed), -speed, next(self.order), actor]
+        self.entries[actor] = entry
+        heapq.heappush(self.heap, entry)
+
+    def remove(self, actor):
+        entry = self.entries.pop(actor, None)
+        if entry is not None:
+            entry[-1] = None
+
+    def next(self):
+        """次に手番が来る行動者を返し、その次の手番を積み直す（全員 remove() 済みなら None）"""
+        heap = self.heap
+        while heap and heap[0][-1] is None:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        time, priority, _, actor = heap[0]
+        self.time = time
+        entry = [time + turn_delay(-priority), priority, next(self.order), actor]
+        self.entries[actor] = entry
+        heapq.heapreplace(heap, entry)
+        return actor
+
+
+class Fighter:
+    """melee() で戦わせる1人分の能力値（ゲームの Enemy も同じ属性を持つのでそのまま渡せる）"""
+
+    def __init__(self, name, hp, attack, defense, speed):
+        self.name = name
+        self.hp = hp
+        self.max_hp = hp
+        self.attack = attack
+        self.defense = defense
+        self.speed = speed
+
+
+class MeleeResult:
+    """melee() の結果"""
+
+    def __init__(self, winner, turns, player_turns, dealt, potions_used):
+        self.winner = winner  # "players" か "enemies"（max_turns で決着がつかなければ None）
+        self.turns = turns  # 両側を合わせた手番の数
+        self.player_turns = player_turns  # プレイヤー側に回ってきた手番の数
+        self.dealt = dealt  # プレイヤー側が与えたダメージの合計
+        self.potions_used = potions_used
+
+
+def melee(players, enemies, rng=random, max_turns=MAX_TURNS, policy=None, potions=0, heal=0,
+          initiative=None, first=None):
+    """プレイヤーの一団と敵の一団を Initiative の順に決着まで戦わせ、MeleeResult を返す
+
+    手番が来た者は相手側で先頭に並んでいる生き残りを攻撃し、HP が 0 になった者は行動順から外す。
+    policy（AutoPolicy）を渡すとプレイヤー側の手番ごとに行動を選ばせ、"heal" なら共有の回復薬 potions を
+    1つ使って heal だけ回復する（max_hp まで）。戦闘中の initiative と今手番が来ている first を渡すと
+    その続きから進める。各自の hp は書き換える。
+    """
+    sides = {f: side for side, group in (("players", players), ("enemies", enemies)) for f in group}
+    alive = {"players": dict.fromkeys(f for f in players if f.hp > 0),
+             "enemies": dict.fromkeys(f for f in enemies if f.hp > 0)}
+    opponents = {"players": alive["enemies"], "enemies": alive["players"]}
+    if initiative is None:
+        initiative = Initiative((f, f.speed) for f in itertools.chain(players, enemies))
+    actor = first if first is not None else initiative.next()
+    player_turns = dealt = potions_used = 0
+    for turn in range(1, max_turns + 1):
+        side = sides[actor]
+        targets = opponents[side]
+        if side == "players":
+            player_turns += 1
+            if policy is not None:
+                risk = max(kill_probability(enemy.attack, actor.defense, actor.hp) for enemy in targets)
+                if policy.choose(actor.hp, actor.max_hp, potions - potions_used, risk) == "heal":
+                    potions_used += 1
+                    actor.hp = min(actor.hp + heal, actor.max_hp)
+                    actor = initiative.next()
+                    continue
+        target = next(iter(targets))
+        hit = damage(actor.attack, target.defense, rng)
+        if side == "players":
+            dealt += min(hit, target.hp)
+        target.hp = max(0, target.hp - hit)
+        if target.hp == 0:
+            del targets[target]
+            initiative.remove(target)
+            if not targets:
+                return MeleeResult(side, turn, player_turns, dealt, potions_used)
+        actor = initiative.next()
+    return MeleeResult(None, max_turns, player_turns, dealt, potions_used)
+
+
+class AutoPolicy:
+    """オートバトルで毎手番の行動を決める方針
+
+    回復薬があり、HP が最大 HP の heal_below 倍を下回っているか、次の敵の一撃で倒れる確率 risk
+    （kill_probability() で引く）が heal_risk 以上なら "heal"、それ以外は "attack"。
+    どちらも None なら攻撃しかしない。
+    """
+
+    def __init__(self, heal_below=None, heal_risk=None):
+        self.heal_below = heal_below
+        self.heal_risk = heal_risk
+
+    def describe(self):
+        """戦闘メニューに出す方針の要約"""
+        rules = []
+        if self.heal_below is not None:
+            rules.append(f"HP<{self.heal_below:.0%}")
+        if self.heal_risk is not None:
+            rules.append(f"KO>={self.heal_risk:.0%}")
+        return "heal: " + " or ".join(rules) if rules else "attack only"
+
+    def choose(self, hp, max_hp, potions, risk=0.0):
+        if not potions:
+            return "attack"
+        if self.heal_below is not None and hp < max_hp * self.heal_below:
+            return "heal"
+        if self.heal_risk is not None and risk >= self.heal_risk:
+            return "heal"
+        return "attack"
+
+
+class Outcome:
+    """resolve() の結果（どれも戦闘ごとの配列）"""
+
+    def __init__(self, turns, player_hp, enemy_hp):
+        self.turns = turns  # プレイヤーに回ってきた手番の数
+        self.player_hp = player_hp  # 残り HP（0 未満は 0）
+        self.enemy_hp = enemy_hp
+        self.won = enemy_hp == 0
+        self.lost = player_hp == 0
+
+    def __len__(self):
+        return len(self.turns)
+
+
+def resolve(player, enemy, rng=None, max_turns=MAX_TURNS):
+    """player 対 enemy の戦闘を決着まで進める
+
+    player・enemy は stats() の配列か、それを縦に積んだ (戦闘数, 4) の配列（片方が1行なら全戦闘で共通）。
+    手番の順は Initiative と同じで、素早さから決まる次の手番の時刻が早い方が攻撃する（同時なら
+    素早い方、素早さも同じならプレイヤーが先）。手番ごとに決着のついていない戦闘の分だけまとめて振るので、
+    戦闘数が多いほど速い。
+    """
+    rng = np.random.default_rng(rng)
+    player, enemy = np.broadcast_arrays(np.atleast_2d(player), np.atleast_2d(enemy))
+    player_hp = player[:, HP].copy()
+    enemy_hp = enemy[:, HP].copy()
+    player_delay = TURN_LENGTH // np.maximum(1, player[:, SPEED])
+    enemy_delay = TURN_LENGTH // np.maximum(1, enemy[:, SPEED])
+    player_time = player_delay.copy()  # 次の手番の時刻
+    enemy_time = enemy_delay.copy()
+    player_first = player[:, SPEED] >= enemy[:, SPEED]  # 同時のときプレイヤーが先か
+    turns = np.zeros(len(player), dtype=np.int64)
+    active = np.arange(len(player))
+    for _ in range(max_turns):
+        if not active.size:
+            break
+        pt, et = player_time[active], enemy_time[active]
+        acts = (pt < et) | ((pt == et) & player_first[active])
+        attackers, defenders = active[acts], active[~acts]
+        turns[attackers] += 1
+        enemy_hp[attackers] -= roll_damage(player[attackers, ATTACK], enemy[attackers, DEFENSE], rng)
+        player_time[attackers] += player_delay[attackers]
+        player_hp[defenders] -= roll_damage(enemy[defenders, ATTACK], player[defenders, DEFENSE], rng)
+        enemy_time[defenders] += enemy_delay[defenders]
+        active = active[(enemy_hp[active] > 0) & (player_hp[active] > 0)]
+    return Outcome(turns, np.maximum(0, player_hp), np.maximum(0, enemy_hp))
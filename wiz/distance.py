@@ -0,0 +1,175 @@
+from collections import deque
+
+import numpy as np
+
+from grid import WALL
+
+
+def _open_flags(grid):
+    return (grid.tiles != WALL).ravel().tolist()
+
+
+def _neighbours(i, width, size):
+    if i >= width:
+        yield i - width
+    if i + width < size:
+        yield i + width
+    if i % width:
+        yield i - 1
+    if (i + 1) % width:
+        yield i + 1
+
+
+def bfs_distances(grid, x, y):
+    """(x, y) から各マスまでの歩数の二次元配列（壁や届かないマスは -1）"""
+    width, size = grid.width, grid.width * grid.height
+    passable = _open_flags(grid)
+    dist = [-1] * size
+    start = y * width + x
+    if passable[start]:
+        dist[start] = 0
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            d = dist[i] + 1
+            for j in _neighbours(i, width, size):
+                if passable[j] and dist[j] < 0:
+                    dist[j] = d
+                    queue.append(j)
+    return np.array(dist, dtype=np.int32).reshape(grid.height, grid.width)
+
+
+class PlayerDistanceField:
+    """プレイヤー位置からの歩数。迷路が木（ループなし）なら1歩ごとに差分だけ更新する
+
+    起点から DFS した木の行きがけ順に距離を並べておくと、隣のマスへ動いたときの変化は
+    「移動先（または移動元）の部分木だけ -1（+1）、残りは +1（-1）」になり、配列のスライス演算で済む。
+    ループがある迷路では起点だけ覚えておき、距離を読まれたときに BFS し直す。
+    """
+
+    def __init__(self, grid, x, y):
+        self.grid = grid
+        self.rebuild(x, y)
+
+    def rebuild(self, x, y):
+        grid = self.grid
+        width, size = grid.width, grid.width * grid.height
+        passable = _open_flags(grid)
+        self.origin = (x, y)
+        start = y * width + x
+
+        order = []
+        parent = [-1] * size
+        depth = [0] * size
+        seen = [False] * size
+        edges = 0
+        if passable[start]:
+            seen[start] = True
+            stack = [start]
+            while stack:
+                i = stack.pop()
+                order.append(i)
+                for j in _neighbours(i, width, size):
+                    if not passable[j]:
+                        continue
+                    edges += 1
+                    if not seen[j]:
+                        seen[j] = True
+                        parent[j] = i
+                        depth[j] = depth[i] + 1
+                        stack.append(j)
+
+        # 辺は両側から数えているので半分にする
+        self.is_tree = edges // 2 == len(order) - 1
+        if not self.is_tree:
+            self.dist = None  # 読まれたときに BFS する
+            return
+
+        # 部分木の大きさ（行きがけ順の逆から親へ足し込む）
+        subtree = [1] * size
+        for i in reversed(order[1:]):
+            subtree[parent[i]] += subtree[i]
+        position = np.full(size, -1, dtype=np.int32)
+        position[order] = np.arange(len(order), dtype=np.int32)
+        self.order = np.array(order, dtype=np.int32)
+        self.position = position  # マス -> 行きがけ順の位置（届かないマスは -1）
+        self.parent = parent
+        self.subtree = subtree
+        self.values = np.array([depth[i] for i in order], dtype=np.int32)
+
+    def move_to(self, x, y):
+        """起点を (x, y) に移す（隣のマスなら差分更新）"""
+        ox, oy = self.origin
+        if (x, y) == (ox, oy):
+            return
+        if not self.is_tree:
+            self.origin = (x, y)
+            self.dist = None
+            return
+        if abs(x - ox) + abs(y - oy) != 1:
+            self.rebuild(x, y)
+            return
+        width = self.grid.width
+        p, q = oy * width + ox, y * width + x
+        if self.parent[q] == p:
+            # 移動先の部分木は近づき、それ以外は遠ざかる
+            start = self.position[q]
+            self.values += 1
+            self.values[start:start + self.subtree[q]] -= 2
+        elif self.parent[p] == q:
+            start = self.position[p]
+            self.values -= 1
+            self.values[start:start + self.subtree[p]] += 2
+        else:
+            self.rebuild(x, y)
+            return
+        self.origin = (x, y)
+
+    def bfs_field(self):
+        if self.dist is None:
+            self.dist = bfs_distances(self.grid, *self.origin)
+        return self.dist
+
+    def distance(self, x, y):
+        """(x, y) までの歩数（届かなければ -1）"""
+        if not self.is_tree:
+            return int(self.bfs_field()[y, x])
+        pos = self.position[y * self.grid.width + x]
+        return -1 if pos < 0 else int(self.values[pos])
+
+    def field(self):
+        """二次元配列で返す（壁や届かないマスは -1）"""
+        if not self.is_tree:
+            return self.bfs_field()
+        out = np.full(self.grid.width * self.grid.height, -1, dtype=np.int32)
+        out[self.order] = self.values
+        return out.reshape(self.grid.height, self.grid.width)
+
+
+class FloorDistances:
+    """1フロア分の距離場のキャッシュ。階段などの固定地点は1回だけ BFS し、プレイヤーからの距離は差分更新する"""
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.fields = {}  # (x, y) -> 二次元配列
+        self.player = None
+
+    def from_cell(self, x, y):
+        field = self.fields.get((x, y))
+        if field is None:
+            field = bfs_distances(self.grid, x, y)
+            self.fields[(x, y)] = field
+        return field
+
+    def from_tile(self, tile):
+        """tile（階段など）からの距離場（そのタイルが無ければ None）"""
+        pos = self.grid.find(tile)
+        return None if pos is None else self.from_cell(*pos)
+
+    def track_player(self, x, y):
+        """プレイヤーの位置を伝えて距離場を更新する"""
+        if self.player is None:
+            self.player = PlayerDistanceField(self.grid, x, y)
+        else:
+            self.player.move_to(x, y)
+        return self.player
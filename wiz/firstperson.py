@@ -0,0 +1,143 @@
+import pyxel
+
+from grid import DOWN_STAIRS, UP_STAIRS, WALL
+
+# 向き（北、東、南、西）ごとの移動量
+DX = [0, 1, 0, -1]
+DY = [-1, 0, 1, 0]
+
+VIEW_DEPTH = 4  # 何マス先まで描くか
+NEAR_Z = 0.5  # これより手前は描かない（足元の壁が画面の外枠になる）
+
+CEILING_COLOR = 0
+FLOOR_COLOR = 1
+FRONT_COLOR = 13
+SIDE_COLOR = 5
+EDGE_COLOR = 7
+STAIRS_COLORS = {UP_STAIRS: 11, DOWN_STAIRS: 8}
+ENEMY_COLOR = 8
+CHEST_COLOR = 10
+
+
+class FirstPersonView:
+    """Wizardry 風の一人称視点
+
+    プレイヤーのマスを奥行き 0 として、(奥行き d, 左右 l) のマスの壁が画面のどこに来るかを
+    最初に一度だけ計算して表にしておく。毎フレームは表を奥から順になぞり、そのマスが壁かどうかを見て
+    塗るだけなので、画素ごとの計算はしない。
+    """
+
+    def __init__(self, x, y, width, height, depth=VIEW_DEPTH):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.depth = depth
+        self.focal = width / 2  # 奥行き NEAR_Z で左右 0.5 マスが画面端に来る
+        self.table = self.build_table()
+
+    # ---- 表の作成（初期化時に1回だけ） ----
+
+    def project(self, lateral, z):
+        """視点座標 (左右, 奥行き) を画面 x に、奥行き z での壁の上端・下端の y を返す"""
+        scale = self.focal / z
+        cx = self.x + self.width / 2
+        cy = self.y + self.height / 2
+        return (round(cx + lateral * scale), round(cy - 0.5 * scale), round(cy + 0.5 * scale))
+
+    def overlaps(self, left, right):
+        """画面 x の範囲 [left, right) が表示枠にかかるか"""
+        return left < self.x + self.width and right > self.x
+
+    def build_table(self):
+        """奥から順に (奥行き, 左右, 種類, 形) を並べた表を作る"""
+        table = []
+        for d in range(self.depth - 1, -1, -1):
+            near, far = max(d, NEAR_Z), d + 1
+            laterals = sorted(range(-d - 1, d + 2), key=lambda l: -abs(l))  # 外側から内側へ
+            for l in laterals:
+                # 床の印（階段）: 奥行き d〜d+1 の床面の台形
+                lx0, _, nb = self.project(l - 0.5, near)
+                lx1, _, _ = self.project(l + 0.5, near)
+                fx0, _, fb = self.project(l - 0.5, far)
+                fx1, _, _ = self.project(l + 0.5, far)
+                if self.overlaps(min(lx0, fx0), max(lx1, fx1)):
+                    table.append((d, l, "floor", (lx0, lx1, nb, fx0, fx1, fb)))
+            for l in laterals:
+                if l == 0:
+                    continue
+                # 側面: 中央寄りの面（l < 0 なら右面、l > 0 なら左面）
+                edge = l + 0.5 if l < 0 else l - 0.5
+                sx0, top0, bottom0 = self.project(edge, near)
+                sx1, top1, bottom1 = self.project(edge, far)
+                if self.overlaps(min(sx0, sx1), max(sx0, sx1)):
+                    table.append((d, l, "side", (sx0, top0, bottom0, sx1, top1, bottom1)))
+            for l in laterals:
+                if d == 0:
+                    continue  # 足元の物は描かない
+                # 物（敵・宝箱）: マスの中央に置く小さな四角
+                cx, top, bottom = self.project(l, d + 0.5)
+                size = max(1, (bottom - top) // 3)
+                if self.overlaps(cx - size // 2, cx - size // 2 + size):
+                    table.append((d, l, "object", (cx - size // 2, bottom - size, size)))
+            if d == 0:
+                continue
+            for l in laterals:
+                # 正面: 奥行き d の面
+                x0, top, bottom = self.project(l - 0.5, d)
+                x1, _, _ = self.project(l + 0.5, d)
+                if self.overlaps(x0, x1):
+                    table.append((d, l, "front", (x0, top, x1 - x0, bottom - top)))
+        return table
+
+    # ---- 描画（毎フレーム） ----
+
+    def draw(self, grid, px, py, direction, enemies=None, chests=None):
+        """(px, py) から direction を向いた景色を描く"""
+        fx, fy = DX[direction], DY[direction]
+        rx, ry = DX[(direction + 1) % 4], DY[(direction + 1) % 4]
+        width, height = grid.width, grid.height
+        tiles = grid.tiles
+
+        def tile(d, l):
+            x, y = px + fx * d + rx * l, py + fy * d + ry * l
+            if 0 <= x < width and 0 <= y < height:
+                return tiles[y, x]
+            return WALL
+
+        pyxel.clip(self.x, self.y, self.width, self.height)
+        pyxel.rect(self.x, self.y, self.width, self.height // 2, CEILING_COLOR)
+        pyxel.rect(self.x, self.y + self.height // 2, self.width, self.height - self.height // 2, FLOOR_COLOR)
+
+        for d, l, kind, shape in self.table:
+            cell = tile(d, l)
+            if kind == "front":
+                if cell == WALL:
+                    x0, top, w, h = shape
+                    pyxel.rect(x0, top, w, h, FRONT_COLOR)
+                    pyxel.rectb(x0, top, w, h, EDGE_COLOR)
+            elif kind == "side":
+                # 中央側の隣が壁なら、この面は隠れている
+                if cell == WALL and tile(d, l + 1 if l < 0 else l - 1) != WALL:
+                    sx0, top0, bottom0, sx1, top1, bottom1 = shape
+                    pyxel.tri(sx0, top0, sx1, top1, sx1, bottom1, SIDE_COLOR)
+                    pyxel.tri(sx0, top0, sx1, bottom1, sx0, bottom0, SIDE_COLOR)
+                    pyxel.line(sx0, top0, sx1, top1, EDGE_COLOR)
+                    pyxel.line(sx0, bottom0, sx1, bottom1, EDGE_COLOR)
+                    pyxel.line(sx1, top1, sx1, bottom1, EDGE_COLOR)
+            elif kind == "floor":
+                color = STAIRS_COLORS.get(int(cell))
+                if color is not None:
+                    lx0, lx1, nb, fx0, fx1, fb = shape
+                    pyxel.tri(lx0, nb, lx1, nb, fx1, fb, color)
+                    pyxel.tri(lx0, nb, fx1, fb, fx0, fb, color)
+            elif cell != WALL and (enemies is not None or chests is not None):
+                x, y = px + fx * d + rx * l, py + fy * d + ry * l
+                left, top, size = shape
+                if enemies is not None and enemies.first_at(x, y) is not None:
+                    pyxel.rect(left, top, size, size, ENEMY_COLOR)
+                elif chests is not None and chests.first_at(x, y) is not None:
+                    pyxel.rect(left, top, size, size, CHEST_COLOR)
+
+        pyxel.clip()
+        pyxel.rectb(self.x, self.y, self.width, self.height, EDGE_COLOR)
@@ -0,0 +1,160 @@
+import random
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def floor_rng(run_seed, index):
+    """(ランの種, フロア番号) から決まる乱数。同じ組なら何度でも同じフロアになる"""
+    return random.Random(f"{run_seed}/{index}")
+
+
+class Floor:
+    """種から生成した1フロア分の配置（迷路・敵の出現位置・宝箱）。生成後は書き換えない"""
+
+    def __init__(self, index, dungeon_map, enemy_spawns, chests, trapped_chests, open_cells, distances):
+        self.index = index
+        self.dungeon_map = dungeon_map
+        self.distances = distances  # 階段・プレイヤーからの距離場のキャッシュ（FloorDistances）
+        self.enemy_spawns = enemy_spawns  # [(敵クラス, x, y), ...]
+        self.chests = chests
+        self.trapped_chests = trapped_chests
+        self.open_cells = open_cells  # 敵・宝箱を置ける通路マスの一次元添字（生成時に1回だけ作る）
+
+
+class FloorState:
+    """フロアごとの変化分（開けた宝箱・いなくなった敵）。配置自体は種から作り直せる"""
+
+    def __init__(self):
+        self.opened_chests = set()
+        self.removed_enemies = set()  # enemy_spawns の添字
+
+
+class ExploredMap:
+    """1フロア分の踏破状況を1マス1ビットで持つ（bit = y * width + x）"""
+
+    def __init__(self, width, height, data=None):
+        self.width = width
+        self.height = height
+        size = (width * height + 7) // 8
+        self.bits = bytearray(size) if data is None else bytearray(data)
+        if len(self.bits) != size:
+            raise ValueError(f"explored map needs {size} bytes, got {len(self.bits)}")
+
+    @classmethod
+    def from_bytes(cls, width, height, data):
+        return cls(width, height, data)
+
+    def to_bytes(self):
+        return bytes(self.bits)
+
+    def is_explored(self, x, y):
+        i = y * self.width + x
+        return (self.bits[i >> 3] >> (i & 7)) & 1 == 1
+
+    def reveal(self, x, y):
+        i = y * self.width + x
+        self.bits[i >> 3] |= 1 << (i & 7)
+
+    def reveal_rect(self, x0, y0, x1, y1):
+        """(x0, y0)〜(x1, y1) の矩形を判明にする（範囲外は切り捨て）"""
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(self.width - 1, x1), min(self.height - 1, y1)
+        for y in range(y0, y1 + 1):
+            for i in range(y * self.width + x0, y * self.width + x1 + 1):
+                self.bits[i >> 3] |= 1 << (i & 7)
+
+    def reveal_mask(self, mask):
+        """height x width の bool 配列で True のマスをまとめて判明にする"""
+        packed = np.packbits(np.asarray(mask, dtype=bool).ravel(), bitorder="little")
+        self.bits = bytearray(np.bitwise_or(np.frombuffer(self.bits, dtype=np.uint8), packed).tobytes())
+
+    def reveal_all(self):
+        self.reveal_mask(np.ones((self.height, self.width), dtype=bool))
+
+    def to_mask(self):
+        """height x width の bool 配列に展開する"""
+        bits = np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8), bitorder="little")
+        return bits[:self.width * self.height].reshape(self.height, self.width).astype(bool)
+
+    def count(self):
+        """判明済みのマス数"""
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def ratio(self):
+        return self.count() / (self.width * self.height)
+
+
+class FloorCache:
+    """最近使ったフロアだけを残す LRU キャッシュ。追い出したフロアは種から再生成する"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.floors = OrderedDict()
+
+    def __contains__(self, index):
+        return index in self.floors
+
+    def __len__(self):
+        return len(self.floors)
+
+    def get(self, index):
+        floor = self.floors.get(index)
+        if floor is not None:
+            self.floors.move_to_end(index)
+        return floor
+
+    def put(self, index, floor):
+        self.floors[index] = floor
+        self.floors.move_to_end(index)
+        while len(self.floors) > self.capacity:
+            self.floors.popitem(last=False)
+
+
+class FloorPrefetcher:
+    """隣のフロアをワーカースレッドで先に生成しておき、階段移動時に完成品を渡す"""
+
+    def __init__(self, build):
+        self.build = build  # build(index) -> Floor
+        self.pending = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="floor-prefetch")
+
+    def request(self, indices):
+        """indices のフロアを先読みする（それ以外の予約は捨てる）"""
+        for index in list(self.pending):
+            if index not in indices:
+                self.pending.pop(index).cancel()
+        if self.executor is None:
+            return
+        for index in indices:
+            if index in self.pending:
+                continue
+            try:
+                self.pending[index] = self.executor.submit(self.build, index)
+            except RuntimeError:
+                # ブラウザ版などスレッドが使えない環境では take() 時に同期生成する
+                self.executor = None
+                return
+
+    def is_ready(self, index):
+        future = self.pending.get(index)
+        return future is not None and future.done()
+
+    def take(self, index):
+        """index のフロアを返す。先読み済みならそれを、無ければその場で生成
+
+        先読みがまだ終わっていなければ future.result() で終わるまで待つ（is_ready() で先に確かめられる）。
+        """
+        future = self.pending.pop(index, None)
+        if future is not None and not future.cancelled():
+            return future.result()
+        return self.build(index)
+
+    def shutdown(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending = {}
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
@@ -0,0 +1,65 @@
+import os
+from collections import OrderedDict
+
+import pyxel
+
+# 日本語用のビットマップフォント（PixelMplus10 から ASCII・かな・UI で使う漢字だけを抜き出した BDF）
+FONT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pixelmplus10_subset.bdf")
+FONT_HEIGHT = 12  # ビットマップフォントの1行の高さ
+BUILTIN_WIDTH = 4  # 組み込みフォントの1文字の幅
+BUILTIN_HEIGHT = 6
+TEXT_CACHE_SIZE = 256  # 画像にして残しておく文字列の数
+
+
+class TextCache:
+    """文字列を (文字列, 色) ごとに Image に描いておき、次からは blt で貼るだけにする
+
+    ASCII だけの文字列は組み込みフォント、それ以外（日本語を含む）はビットマップフォントで描く。
+    フォントは最初に1回だけ読み込み、使われていない文字列の画像から LRU で捨てる。
+    """
+
+    def __init__(self, font_file=FONT_FILE, capacity=TEXT_CACHE_SIZE):
+        self.font = pyxel.Font(font_file)
+        self.capacity = capacity
+        self.images = OrderedDict()  # (文字列, 色) -> (Image, 透明色)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.images)
+
+    def measure(self, s):
+        """s を描いたときの (幅, 高さ)"""
+        lines = s.split("\n")
+        if s.isascii():
+            return max(len(line) for line in lines) * BUILTIN_WIDTH, len(lines) * BUILTIN_HEIGHT
+        return max(self.font.text_width(line) for line in lines), len(lines) * FONT_HEIGHT
+
+    def image(self, s, col):
+        key = (s, col)
+        entry = self.images.get(key)
+        if entry is not None:
+            self.images.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        width, height = self.measure(s)
+        colkey = (col + 1) % 16  # 文字色と違う色を背景（透明色）にする
+        image = pyxel.Image(max(1, width), height)
+        image.cls(colkey)
+        if s.isascii():
+            image.text(0, 0, s, col)
+        else:
+            image.text(0, 0, s, col, self.font)
+        entry = (image, colkey)
+        self.images[key] = entry
+        while len(self.images) > self.capacity:
+            self.images.popitem(last=False)
+        return entry
+
+    def draw(self, target, x, y, s, col):
+        """target（pyxel か Image）の (x, y) に s を貼る"""
+        if not s:
+            return
+        image, colkey = self.image(s, col)
+        target.blt(x, y, image, 0, 0, image.width, image.height, colkey)
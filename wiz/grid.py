@@ -0,0 +1,159 @@
+import random
+
+import numpy as np
+
+# タイルコード
+FLOOR = 0
+WALL = 1
+UP_STAIRS = 2
+DOWN_STAIRS = 3
+
+
+class DungeonGrid:
+    """1フロア分のマップ（uint8 の二次元配列）。grid[y][x] で従来通り読める"""
+
+    def __init__(self, tiles):
+        self.tiles = np.ascontiguousarray(tiles, dtype=np.uint8)
+        self.height, self.width = self.tiles.shape
+
+    @classmethod
+    def from_rows(cls, rows):
+        """maze[y][x] 形式のリストから作る"""
+        return cls(np.array(rows, dtype=np.uint8))
+
+    @classmethod
+    def from_bytes(cls, cells, width, height):
+        """幅*高さの一次元バッファから作る"""
+        return cls(np.frombuffer(cells, dtype=np.uint8).reshape(height, width).copy())
+
+    # 従来の maze[y][x] 互換の読み出し
+    def __getitem__(self, key):
+        return self.tiles[key]
+
+    def __len__(self):
+        return self.height
+
+    def __iter__(self):
+        return iter(self.tiles)
+
+    def __eq__(self, other):
+        if not isinstance(other, DungeonGrid):
+            return NotImplemented
+        return np.array_equal(self.tiles, other.tiles)
+
+    @property
+    def nbytes(self):
+        return self.tiles.nbytes
+
+    def to_rows(self):
+        return self.tiles.tolist()
+
+    def tile(self, x, y):
+        return int(self.tiles[y, x])
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_walkable(self, x, y):
+        """範囲内かつ壁でなければ True"""
+        return 0 <= x < self.width and 0 <= y < self.height and self.tiles[y, x] != WALL
+
+    def find(self, tile):
+        """指定タイルの座標 (x, y) を返す（無ければ None）"""
+        ys, xs = np.nonzero(self.tiles == tile)
+        if len(xs) == 0:
+            return None
+        return int(xs[0]), int(ys[0])
+
+    def open_cells(self, exclude=(), radius=0):
+        """通路マス（階段は除く）の一次元添字 y * width + x。exclude の各座標から radius マス以内も除く"""
+        mask = self.tiles == FLOOR
+        for x, y in exclude:
+            mask[max(0, y - radius):y + radius + 1, max(0, x - radius):x + radius + 1] = False
+        return np.flatnonzero(mask)
+
+    # ---- 一括処理 ----
+
+    def open_mask(self):
+        """壁以外のマスが True の bool 配列"""
+        return self.tiles != WALL
+
+    def tile_counts(self):
+        """タイルコードごとのマス数"""
+        return np.bincount(self.tiles.ravel(), minlength=4)
+
+    def neighbour_counts(self, diagonal=False):
+        """各マスに隣接する通路の数（外周の外は壁扱い）"""
+        padded = np.pad(self.open_mask(), 1).astype(np.uint8)
+        h, w = self.height, self.width
+        counts = (padded[0:h, 1:w + 1] + padded[2:h + 2, 1:w + 1]
+                  + padded[1:h + 1, 0:w] + padded[1:h + 1, 2:w + 2])
+        if diagonal:
+            counts += (padded[0:h, 0:w] + padded[0:h, 2:w + 2]
+                       + padded[2:h + 2, 0:w] + padded[2:h + 2, 2:w + 2])
+        return counts
+
+    def wall_distance(self):
+        """各マスから最も近い壁までの歩数（上下左右・外周の外は壁扱い）"""
+        h, w = self.height, self.width
+        unset = np.iinfo(np.int32).max
+        dist = np.full((h + 2, w + 2), 0, dtype=np.int32)
+        dist[1:h + 1, 1:w + 1] = np.where(self.open_mask(), unset, 0)
+        frontier = dist == 0
+        step = 0
+        while True:
+            step += 1
+            grown = np.zeros_like(frontier)
+            grown[1:, :] |= frontier[:-1, :]
+            grown[:-1, :] |= frontier[1:, :]
+            grown[:, 1:] |= frontier[:, :-1]
+            grown[:, :-1] |= frontier[:, 1:]
+            frontier = grown & (dist == unset)
+            if not frontier.any():
+                break
+            dist[frontier] = step
+        return dist[1:h + 1, 1:w + 1]
+
+    def rewrite(self, mapping, mask=None):
+        """{旧タイル: 新タイル} で一括置換する（mask で範囲を限定できる）"""
+        table = np.arange(256, dtype=np.uint8)
+        for old, new in mapping.items():
+            table[old] = new
+        if mask is None:
+            self.tiles[...] = table[self.tiles]
+        else:
+            self.tiles[mask] = table[self.tiles[mask]]
+
+    def fill(self, tile, mask):
+        """mask が True のマスを tile で塗る"""
+        self.tiles[mask] = tile
+
+
+class CellSampler:
+    """セル添字の中から重複なしで一様に1つずつ取り出す（部分 Fisher-Yates で1回 O(1)）"""
+
+    def __init__(self, cells, width, rng=random):
+        self.cells = [int(i) for i in cells]
+        self.width = width
+        self.rng = rng
+        self.taken = 0
+
+    def __len__(self):
+        return len(self.cells) - self.taken
+
+    def sample(self):
+        """未使用のマスを1つ選んで (x, y) を返す（残っていなければ None）"""
+        cells, k = self.cells, self.taken
+        if k >= len(cells):
+            return None
+        j = self.rng.randrange(k, len(cells))
+        cells[k], cells[j] = cells[j], cells[k]
+        self.taken = k + 1
+        return cells[k] % self.width, cells[k] // self.width
+
+    def sample_many(self, count):
+        """最大 count マスを取り出す"""
+        picks = []
+        for _ in range(min(count, len(self))):
+            picks.append(self.sample())
+        return picks
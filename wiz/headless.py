@@ -0,0 +1,460 @@
+"""ウィンドウを開かずにゲームを動かすための pyxel の代用品（NumPy の画面バッファに描く）
+
+install() で sys.modules["pyxel"] をこのモジュールに差し替えてからゲームを読み込むと、
+pyxel.run() は update/draw を覚えて戻るだけになり、step() で1フレームずつ進められる。
+画面は screen.data（色番号の uint8 配列）で、checksum() で比較できる。
+
+    python headless.py [フレーム数] [種] [instant]  # scenario() の入力で wiz_v20.py を回して速度とチェックサムを出す
+
+種はゲームの乱数（迷路・敵の配置など）の種。instant を付けると戦闘は始まった瞬間にオートバトルで
+決着させる（App.instant_battles）。
+"""
+import os
+import random
+import runpy
+import sys
+import time
+import tomllib
+import zipfile
+import zlib
+
+import numpy as np
+import pyxel as _pyxel  # 文字の形（組み込みフォント）とキー番号だけ本物から借りる
+
+from distance import bfs_distances
+
+FONT_WIDTH = 4
+FONT_HEIGHT = 6
+FIRST_CHAR = 32
+LAST_CHAR = 126
+
+# キー番号は本物と同じにしておく
+for _name in dir(_pyxel):
+    if _name.startswith(("KEY_", "MOUSE_", "GAMEPAD")):
+        globals()[_name] = getattr(_pyxel, _name)
+
+_glyphs = None
+
+
+def _font():
+    """ASCII の字形を1回だけ本物の pyxel.Image に描いて読み取り、(文字数, 高さ, 幅) の bool 配列にする"""
+    global _glyphs
+    if _glyphs is None:
+        count = LAST_CHAR - FIRST_CHAR + 1
+        image = _pyxel.Image(count * FONT_WIDTH, FONT_HEIGHT)
+        image.cls(0)
+        image.text(0, 0, "".join(chr(c) for c in range(FIRST_CHAR, LAST_CHAR + 1)), 1)
+        pixels = np.array([[image.pget(x, y) for x in range(count * FONT_WIDTH)] for y in range(FONT_HEIGHT)])
+        _glyphs = (pixels != 0).reshape(FONT_HEIGHT, count, FONT_WIDTH).transpose(1, 0, 2)
+    return _glyphs
+
+
+class Font:
+    """BDF/TTF フォント。字形は本物の pyxel.Font で描いて読み取る"""
+
+    def __init__(self, filename, font_size=10.0):
+        self.font = _pyxel.Font(filename, font_size)
+        self.line_height = int(font_size) * 2  # 字形を読み取る高さ（余裕を持たせる）
+
+    def text_width(self, s):
+        return self.font.text_width(s)
+
+    def mask(self, s):
+        """s の字形の bool 配列"""
+        lines = s.split("\n")
+        width = max(1, max(self.font.text_width(line) for line in lines))
+        height = self.line_height * len(lines)
+        image = _pyxel.Image(width, height)
+        image.cls(0)
+        image.text(0, 0, s, 1, self.font)
+        return np.array([[image.pget(x, y) for x in range(width)] for y in range(height)]) != 0
+
+
+class Image:
+    """色番号の二次元配列に pyxel.Image と同じ名前の描画命令で描く（座標は切り捨て、範囲外は捨てる）"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.data = np.zeros((height, width), dtype=np.uint8)
+        self.clip()
+
+    def clip(self, x=None, y=None, w=None, h=None):
+        """描画範囲を絞る（引数なしで全体に戻す）"""
+        if x is None:
+            self.clip_rect = (0, 0, self.width, self.height)
+        else:
+            x, y, w, h = int(x), int(y), int(w), int(h)
+            self.clip_rect = (max(0, x), max(0, y), min(self.width, x + w), min(self.height, y + h))
+
+    def _region(self, x, y, w, h):
+        """矩形を描画範囲で切った (x0, y0, x1, y1)。何も残らなければ None"""
+        cx0, cy0, cx1, cy1 = self.clip_rect
+        x0, y0 = max(cx0, x), max(cy0, y)
+        x1, y1 = min(cx1, x + w), min(cy1, y + h)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return x0, y0, x1, y1
+
+    def cls(self, col):
+        self.data[:, :] = col
+
+    def pget(self, x, y):
+        x, y = int(x), int(y)
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return int(self.data[y, x])
+        return 0
+
+    def pset(self, x, y, col):
+        x, y = int(x), int(y)
+        cx0, cy0, cx1, cy1 = self.clip_rect
+        if cx0 <= x < cx1 and cy0 <= y < cy1:
+            self.data[y, x] = col
+
+    def set(self, x, y, data):
+        """16進1文字を1ピクセルとした文字列の並びで (x, y) から書き込む"""
+        x, y = int(x), int(y)
+        for row, line in enumerate(data):
+            codes = np.frombuffer(line.lower().encode(), dtype=np.uint8)
+            values = np.where(codes >= ord("a"), codes - ord("a") + 10, codes - ord("0")).astype(np.uint8)
+            region = self._region(x, y + row, len(values), 1)
+            if region is not None:
+                x0, y0, x1, y1 = region
+                self.data[y0, x0:x1] = values[x0 - x:x1 - x]
+
+    def rect(self, x, y, w, h, col):
+        region = self._region(int(x), int(y), int(w), int(h))
+        if region is not None:
+            x0, y0, x1, y1 = region
+            self.data[y0:y1, x0:x1] = col
+
+    def rectb(self, x, y, w, h, col):
+        x, y, w, h = int(x), int(y), int(w), int(h)
+        if w <= 0 or h <= 0:
+            return
+        self.rect(x, y, w, 1, col)
+        self.rect(x, y + h - 1, w, 1, col)
+        self.rect(x, y, 1, h, col)
+        self.rect(x + w - 1, y, 1, h, col)
+
+    def line(self, x1, y1, x2, y2, col):
+        steps = int(max(abs(x2 - x1), abs(y2 - y1)))
+        t = np.linspace(0.0, 1.0, steps + 1)
+        xs = np.floor(x1 + (x2 - x1) * t + 0.5).astype(np.int64)
+        ys = np.floor(y1 + (y2 - y1) * t + 0.5).astype(np.int64)
+        self._plot(xs, ys, col)
+
+    def _plot(self, xs, ys, col):
+        cx0, cy0, cx1, cy1 = self.clip_rect
+        keep = (xs >= cx0) & (xs < cx1) & (ys >= cy0) & (ys < cy1)
+        self.data[ys[keep], xs[keep]] = col
+
+    def tri(self, x1, y1, x2, y2, x3, y3, col):
+        """3点を頂点とする三角形を塗る（画素の中心が内側か辺上なら塗る）"""
+        region = self._region(int(min(x1, x2, x3)), int(min(y1, y2, y3)),
+                              int(max(x1, x2, x3)) - int(min(x1, x2, x3)) + 1,
+                              int(max(y1, y2, y3)) - int(min(y1, y2, y3)) + 1)
+        if region is None:
+            return
+        x0, y0, xe, ye = region
+        px, py = np.meshgrid(np.arange(x0, xe), np.arange(y0, ye))
+
+        def edge(ax, ay, bx, by):
+            return (bx - ax) * (py - ay) - (by - ay) * (px - ax)
+
+        e1, e2, e3 = edge(x1, y1, x2, y2), edge(x2, y2, x3, y3), edge(x3, y3, x1, y1)
+        inside = ((e1 >= 0) & (e2 >= 0) & (e3 >= 0)) | ((e1 <= 0) & (e2 <= 0) & (e3 <= 0))
+        self.data[y0:ye, x0:xe][inside] = col
+
+    def text(self, x, y, s, col, font=None):
+        """font（Font）か組み込みフォントで描く（組み込みフォントに無い文字は本物と同じく詰めて飛ばす）"""
+        x, y = int(x), int(y)
+        if font is not None:
+            mask = font.mask(s)
+            region = self._region(x, y, mask.shape[1], mask.shape[0])
+            if region is not None:
+                x0, y0, x1, y1 = region
+                self.data[y0:y1, x0:x1][mask[y0 - y:y1 - y, x0 - x:x1 - x]] = col
+            return
+        glyphs = _font()
+        left = x
+        for ch in s:
+            if ch == "\n":
+                x = left
+                y += FONT_HEIGHT
+                continue
+            code = ord(ch)
+            if not FIRST_CHAR <= code <= LAST_CHAR:
+                continue
+            region = self._region(x, y, FONT_WIDTH, FONT_HEIGHT)
+            if region is not None:
+                x0, y0, x1, y1 = region
+                mask = glyphs[code - FIRST_CHAR][y0 - y:y1 - y, x0 - x:x1 - x]
+                self.data[y0:y1, x0:x1][mask] = col
+            x += FONT_WIDTH
+
+    def blt(self, x, y, img, u, v, w, h, colkey=None):
+        """img の (u, v) から w x h を (x, y) に写す（w, h が負なら反転、colkey の色は透明）"""
+        if isinstance(img, int):
+            img = images[img]
+        x, y, u, v, w, h = int(x), int(y), int(u), int(v), int(w), int(h)
+        src = img.data[v:v + abs(h), u:u + abs(w)]
+        if w < 0:
+            src = src[:, ::-1]
+        if h < 0:
+            src = src[::-1, :]
+        region = self._region(x, y, src.shape[1], src.shape[0])
+        if region is None:
+            return
+        x0, y0, x1, y1 = region
+        src = src[y0 - y:y1 - y, x0 - x:x1 - x]
+        if colkey is None:
+            self.data[y0:y1, x0:x1] = src
+        else:
+            keep = src != colkey
+            self.data[y0:y1, x0:x1][keep] = src[keep]
+
+    def checksum(self):
+        return zlib.crc32(self.data.tobytes())
+
+
+# ---- pyxel と同じ名前のモジュール関数（画面 screen に描く） ----
+
+width = height = 0
+frame_count = 0
+screen = None
+images = [Image(256, 256) for _ in range(3)]
+_update = _draw = None
+_pressed = frozenset()
+_held = frozenset()
+
+
+def init(w, h, **kwargs):
+    global width, height, screen, frame_count
+    width, height = w, h
+    screen = Image(w, h)
+    frame_count = 0
+
+
+def run(update, draw):
+    """update/draw を覚えて戻る（進めるのは step()）"""
+    global _update, _draw
+    _update, _draw = update, draw
+
+
+def quit():
+    pass
+
+
+def btnp(key, hold=None, repeat=None):
+    return key in _pressed
+
+
+def btn(key):
+    return key in _held
+
+
+def cls(col):
+    screen.cls(col)
+
+
+def clip(x=None, y=None, w=None, h=None):
+    screen.clip(x, y, w, h)
+
+
+def pget(x, y):
+    return screen.pget(x, y)
+
+
+def pset(x, y, col):
+    screen.pset(x, y, col)
+
+
+def rect(x, y, w, h, col):
+    screen.rect(x, y, w, h, col)
+
+
+def rectb(x, y, w, h, col):
+    screen.rectb(x, y, w, h, col)
+
+
+def line(x1, y1, x2, y2, col):
+    screen.line(x1, y1, x2, y2, col)
+
+
+def tri(x1, y1, x2, y2, x3, y3, col):
+    screen.tri(x1, y1, x2, y2, x3, y3, col)
+
+
+def text(x, y, s, col, font=None):
+    screen.text(x, y, s, col, font)
+
+
+def blt(x, y, img, u, v, w, h, colkey=None):
+    screen.blt(x, y, img, u, v, w, h, colkey)
+
+
+def load(filename, exclude_images=False, exclude_tilemaps=False, exclude_sounds=False, exclude_musics=False):
+    """.pyxres のイメージバンクだけを読む（中身は zip に入った TOML。省かれた行末・行は 0）"""
+    if exclude_images:
+        return
+    with zipfile.ZipFile(filename) as archive:
+        resource = tomllib.loads(archive.read("pyxel_resource.toml").decode("utf-8"))
+    for image, data in zip(images, resource.get("images", [])):
+        image.cls(0)
+        for y, row in enumerate(data["data"][:image.height]):
+            row = row[:image.width]
+            image.data[y, :len(row)] = row
+
+
+# ---- 実行の制御 ----
+
+GAME_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wiz_v20.py")
+
+
+def install():
+    """以後の import pyxel がこのモジュールを返すようにする"""
+    sys.modules["pyxel"] = sys.modules[__name__]
+
+
+def step(*keys, held=None):
+    """keys を押したことにして1フレーム進める"""
+    global _pressed, _held, frame_count
+    _pressed = frozenset(keys)
+    _held = frozenset(keys if held is None else held)
+    _update()
+    _draw()
+    frame_count += 1
+
+
+def checksum():
+    return screen.checksum()
+
+
+def game():
+    """run() に渡された update の持ち主（ゲームの App）"""
+    return getattr(_update, "__wrapped__", _update).__self__
+
+
+def load_game(path, seed=None):
+    """ゲームのスクリプトを読み込んで最初のフレームの直前まで進める"""
+    install()
+    if seed is not None:
+        random.seed(seed)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+    runpy.run_path(path, run_name="__main__")
+
+
+def play(frames, keys=None):
+    """keys（既定は scenario()）の入力で frames フレーム進め、毎フレームの画面をつなげたチェックサムを返す
+
+    入力が尽きたら何も押さずに進める。F1 の計測 HUD は実測の時間を出すので、出ている間の画面は数えない。
+    """
+    keys = scenario(game()) if keys is None else keys
+    digest = 0
+    for _ in range(frames):
+        step(*next(keys, ()))
+        if not game().profiler.visible:
+            digest = zlib.crc32(screen.data.tobytes(), digest)
+    return digest
+
+
+# ---- 決まった手順で遊ぶ入力（1フレーム分の押すキーを yield する） ----
+
+TOWN_DUNGEON = 2  # 町のメニューの「ダンジョン」
+BATTLE_AUTO = 3  # 戦闘コマンドの「Auto」
+SCENARIO_BATTLES = 3  # scenario() で敵を探して戦う回数
+DX = [0, 1, 0, -1]  # 向き 0..3（北・東・南・西）の1歩
+DY = [-1, 0, 1, 0]
+
+
+def scenario(app):
+    """ダンジョンに入り、メニュー・オートマップの拡大縮小・一人称視点・F1 の計測を開いてから、
+    近い敵と SCENARIO_BATTLES 回戦い（Auto で決着）、近くの宝箱を開ける
+
+    ゲームの状態を見ながら次のキーを決めるので、迷路や敵の配置が変わっても同じ場面を通る。
+    """
+    yield from enter_dungeon(app)
+    yield from press(_pyxel.KEY_TAB, _pyxel.KEY_RIGHT, _pyxel.KEY_RIGHT, _pyxel.KEY_TAB)
+    yield from press(_pyxel.KEY_M, *[_pyxel.KEY_Q] * 3, *[_pyxel.KEY_E] * 6, _pyxel.KEY_M)
+    yield from press(_pyxel.KEY_V, _pyxel.KEY_D, _pyxel.KEY_W, _pyxel.KEY_A, _pyxel.KEY_V)
+    yield from press(_pyxel.KEY_F1, None, None, _pyxel.KEY_F1)
+    for _ in range(SCENARIO_BATTLES):
+        yield from enter_dungeon(app)
+        yield from walk_to(app, nearest(app, [app.enemies.position(enemy) for enemy in app.enemies]))
+    for _ in range(SCENARIO_BATTLES):  # 途中の敵に負けたら町からやり直す
+        yield from enter_dungeon(app)
+        chest = nearest(app, list(app.chests))
+        yield from walk_to(app, chest)
+        if (app.player_x, app.player_y) == chest and not app.in_town:
+            # 宝箱のウィンドウを開いて「開ける」、結果を閉じる（警報の罠なら閉じてから戦闘になる）
+            yield from press(_pyxel.KEY_SPACE, _pyxel.KEY_RETURN, _pyxel.KEY_RETURN)
+            yield from fight(app)
+            break
+
+
+def press(*keys):
+    """keys を1フレームに1つずつ押す（None は何も押さないフレーム）"""
+    for key in keys:
+        yield () if key is None else (key,)
+
+
+def enter_dungeon(app):
+    """町にいれば、メニューで「ダンジョン」を選んで入る"""
+    while app.in_town:
+        yield (_pyxel.KEY_RETURN,) if app.town_menu == TOWN_DUNGEON else (_pyxel.KEY_DOWN,)
+
+
+def fight(app):
+    """戦闘が終わるまで、自分の手番では Auto を選び、ログは Enter で進める"""
+    while app.in_battle:
+        if app.battle_state == "player_action":
+            yield (_pyxel.KEY_RETURN,) if app.battle_command == BATTLE_AUTO else (_pyxel.KEY_DOWN,)
+        elif app.battle_state == "enemy_turn":
+            yield ()  # 敵の攻撃は次の update で進む
+        else:
+            yield (_pyxel.KEY_RETURN,)
+
+
+def nearest(app, cells):
+    """cells のうちプレイヤーから歩いて一番近いマス（行けるものが無ければ None）"""
+    dist = bfs_distances(app.dungeon_map, app.player_x, app.player_y)
+    reachable = [(int(dist[y, x]), (x, y)) for x, y in cells if dist[y, x] >= 0]
+    return min(reachable)[1] if reachable else None
+
+
+def walk_to(app, target):
+    """target のマスまで最短路を歩く（向きを変えてから W で進む）。途中で戦闘になったらそこで終える"""
+    if target is None:
+        return
+    dist = bfs_distances(app.dungeon_map, *target)
+    floor = app.floor
+    while (app.player_x, app.player_y) != target and not app.in_town and app.floor == floor:
+        if app.in_battle:
+            yield from fight(app)
+            return
+        x, y = app.player_x, app.player_y
+        for d in range(4):
+            nx, ny = x + DX[d], y + DY[d]
+            if 0 <= nx < app.map_width and 0 <= ny < app.map_height and dist[ny, nx] == dist[y, x] - 1:
+                break
+        if d == app.player_dir:
+            yield (_pyxel.KEY_W,)
+        else:
+            yield (_pyxel.KEY_D,) if d == (app.player_dir + 1) % 4 else (_pyxel.KEY_A,)
+    yield from fight(app)
+
+
+def main(argv):
+    frames = int(argv[1]) if len(argv) > 1 else 1000
+    seed = int(argv[2]) if len(argv) > 2 else 0
+    load_game(GAME_FILE, seed)
+    game().instant_battles = len(argv) > 3 and argv[3] == "instant"
+    start = time.perf_counter()
+    digest = play(frames)
+    elapsed = time.perf_counter() - start
+    print(f"{frames} frames in {elapsed:.2f}s ({frames / elapsed:.0f} fps), digest {digest:08x}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,239 @@
+import random
+from collections import deque
+
+from grid import DungeonGrid, FLOOR, WALL, UP_STAIRS, DOWN_STAIRS
+
+
+def carve_maze(width, height, rng=random):
+    """穴掘り法で迷路を掘り、幅*高さの一次元 bytearray で返す（再帰なし）"""
+    cells = bytearray([WALL]) * (width * height)
+    if width < 3 or height < 3:
+        return cells
+
+    # 2マス先への移動量（一次元インデックス上）
+    steps = (-2 * width, 2, 2 * width, -2)
+    cells[width + 1] = FLOOR
+    stack = [(1, 1)]
+    randrange = rng.randrange
+    while stack:
+        x, y = stack[-1]
+        i = y * width + x
+        # 未開通の隣接セルを集める
+        options = []
+        if y > 2 and cells[i + steps[0]]:
+            options.append(0)
+        if x + 2 < width and cells[i + steps[1]]:
+            options.append(1)
+        if y + 2 < height and cells[i + steps[2]]:
+            options.append(2)
+        if x > 2 and cells[i + steps[3]]:
+            options.append(3)
+        if not options:
+            stack.pop()
+            continue
+        d = options[0] if len(options) == 1 else options[randrange(len(options))]
+        step = steps[d]
+        cells[i + step // 2] = FLOOR
+        cells[i + step] = FLOOR
+        if d == 0:
+            stack.append((x, y - 2))
+        elif d == 1:
+            stack.append((x + 2, y))
+        elif d == 2:
+            stack.append((x, y + 2))
+        else:
+            stack.append((x - 2, y))
+    return cells
+
+
+def generate_maze(width, height, rng=random):
+    """迷路を生成して階段を置き、DungeonGrid で返す"""
+    if width < 5 or height < 5:
+        # これより小さいと階段を置く場所がない（3x3 では上下の階段が同じマスになる）
+        raise ValueError(f"maze must be at least 5x5, got {width}x{height}")
+    cells = carve_maze(width, height, rng)
+    cells[(height - 2) * width + width - 2] = DOWN_STAIRS  # 下層への階段
+    cells[width + width - 2] = UP_STAIRS  # 地上への階段
+    # 階段が入口から行けなければ、最短で壁を掘ってつなぐ
+    repair_reachability(cells, width, height, width + 1, [(height - 2) * width + width - 2, width + width - 2])
+    return DungeonGrid.from_bytes(cells, width, height)
+
+
+def _neighbours(i, width, size):
+    if i >= width:
+        yield i - width
+    if i + width < size:
+        yield i + width
+    if i % width:
+        yield i - 1
+    if (i + 1) % width:
+        yield i + 1
+
+
+def reachable_cells(cells, width, height, start):
+    """start（一次元添字）から歩いて行けるマスの bytearray（1 = 到達可能）"""
+    size = width * height
+    reached = bytearray(size)
+    if cells[start] == WALL:
+        return reached
+    reached[start] = 1
+    queue = deque([start])
+    while queue:
+        i = queue.popleft()
+        for j in _neighbours(i, width, size):
+            if not reached[j] and cells[j] != WALL:
+                reached[j] = 1
+                queue.append(j)
+    return reached
+
+
+def unreachable_targets(cells, width, height, start, targets):
+    """targets のうち start から行けないマスの一覧"""
+    reached = reachable_cells(cells, width, height, start)
+    return [t for t in targets if not reached[t]]
+
+
+def repair_reachability(cells, width, height, start, targets):
+    """start から行けない targets があれば、壁を掘る数が最小の通路を掘ってつなぐ
+
+    cells をその場で書き換え、掘ったマス数を返す。外周の壁は掘らない。
+    """
+    size = width * height
+    reached = reachable_cells(cells, width, height, start)
+    dug = 0
+    for target in targets:
+        if reached[target]:
+            continue
+        # 0-1 BFS: 壁に入るとコスト 1、通路は 0。最初に到達済みのマスへ着いた経路が最短
+        cost = [size] * size
+        prev = [-1] * size
+        cost[target] = 0
+        queue = deque([target])
+        end = -1
+        while queue:
+            i = queue.popleft()
+            if reached[i]:
+                end = i
+                break
+            for j in _neighbours(i, width, size):
+                if cells[j] == WALL:
+                    x, y = j % width, j // width
+                    if x == 0 or y == 0 or x == width - 1 or y == height - 1:
+                        continue
+                    c = cost[i] + 1
+                    if c < cost[j]:
+                        cost[j] = c
+                        prev[j] = i
+                        queue.append(j)
+                elif cost[i] < cost[j]:
+                    cost[j] = cost[i]
+                    prev[j] = i
+                    queue.appendleft(j)
+        if end < 0:
+            continue
+        i = prev[end]
+        while i >= 0:
+            if cells[i] == WALL:
+                cells[i] = FLOOR
+                dug += 1
+            i = prev[i]
+        # 掘った通路と、それでつながった区画を到達済みにする
+        for i, flag in enumerate(reachable_cells(cells, width, height, start)):
+            if flag:
+                reached[i] = 1
+    return dug
+
+
+def eller_rows(width, rng=random, join_chance=0.5, down_chance=0.4):
+    """Eller 法で迷路を上から1行ずつ生成するジェネレータ（状態は O(width)、終わりなし）
+
+    タイル行を bytearray で返す。1行目は外周の壁、以降は「部屋の行」と「縦通路の行」が交互に続く。
+    幅は 3 以上の奇数（偶数だと右端の壁が2マスになる）。
+    """
+    if width < 3 or width % 2 == 0:
+        raise ValueError(f"width must be an odd number of at least 3, got {width}")
+    return _eller_rows(width, rng, join_chance, down_chance)
+
+
+def _eller_rows(width, rng, join_chance, down_chance):
+    n = (width - 1) // 2  # 部屋の列数（x = 2 * i + 1）
+    yield bytearray([WALL]) * width
+    sets = [0] * n  # 各列の部屋が属する集合（0 は未所属）
+    members = {}  # 集合 -> その集合に属する列
+    next_id = 1
+    while True:
+        for i in range(n):
+            if not sets[i]:
+                sets[i] = next_id
+                members[next_id] = [i]
+                next_id += 1
+
+        row = bytearray([WALL]) * width
+        for i in range(n):
+            row[2 * i + 1] = FLOOR
+        # 隣の部屋と別の集合ならランダムにつなぐ（小さい方の集合を大きい方へ付け替える）
+        for i in range(n - 1):
+            a, b = sets[i], sets[i + 1]
+            if a != b and rng.random() < join_chance:
+                row[2 * i + 2] = FLOOR
+                if len(members[a]) < len(members[b]):
+                    a, b = b, a
+                moved = members.pop(b)
+                for j in moved:
+                    sets[j] = a
+                members[a].extend(moved)
+        yield row
+
+        # 各集合から最低1つは下へ通路を伸ばす。伸ばさなかった列は次の行で新しい集合になる
+        below = bytearray([WALL]) * width
+        next_members = {}
+        for set_id, cols in members.items():
+            down = [i for i in cols if rng.random() < down_chance]
+            if not down:
+                down = [cols[rng.randrange(len(cols))]]
+            for i in cols:
+                sets[i] = 0
+            for i in down:
+                sets[i] = set_id
+                below[2 * i + 1] = FLOOR
+            next_members[set_id] = down
+        members = next_members
+        yield below
+
+
+class EndlessMaze:
+    """下へ無限に続くフロア。歩いた先の行だけ生成し、後ろの行は捨てる（メモリは一定）
+
+    DungeonGrid と同じく maze[y][x] と is_walkable(x, y) で読める。y は入口からの通し番号。
+    """
+
+    def __init__(self, width, rng=random, keep=64):
+        self.width = width
+        self.keep = keep  # 手元に残しておく行数
+        self.stream = eller_rows(width, rng)
+        self.rows = deque()
+        self.top = 0  # rows[0] の y 座標
+        self.row(1)[2 * ((width - 1) // 2) - 1] = UP_STAIRS  # 地上への階段
+
+    def row(self, y):
+        """y 行目を返す（まだなら生成、捨てた行なら IndexError）"""
+        if y < self.top:
+            raise IndexError(f"row {y} has already been discarded")
+        while y >= self.top + len(self.rows):
+            self.rows.append(next(self.stream))
+        return self.rows[y - self.top]
+
+    def __getitem__(self, y):
+        return self.row(y)
+
+    def trim(self, y):
+        """y 行目より keep 行以上うしろの行を捨てる"""
+        while self.top < y - self.keep and self.rows:
+            self.rows.popleft()
+            self.top += 1
+
+    def is_walkable(self, x, y):
+        """範囲内かつ壁でなければ True（捨てた行は壁扱い）"""
+        if not 0 <= x < self.width or y < self.top:
+            return False
+        return self.row(y)[x] != WALL
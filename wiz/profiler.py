@@ -0,0 +1,186 @@
+import time
+from collections import Counter, defaultdict, deque
+from functools import wraps
+
+import pyxel
+
+FRAME_HISTORY = 60  # 何フレーム分を残すか
+FRAME_BUDGET = 1 / 30  # 30 fps で1フレームに使える秒数
+COUNTED_CALLS = ["rect", "rectb", "text", "blt", "line", "tri"]  # 数える pyxel の描画関数
+
+
+class FrameRecord:
+    """1フレーム分の計測結果"""
+
+    def __init__(self, times, calls):
+        self.times = times  # 処理名 -> 秒
+        self.calls = calls  # 描画関数名 -> 回数
+        self.total = times.get("update", 0.0) + times.get("draw", 0.0)
+
+    def over_budget(self, budget=FRAME_BUDGET):
+        return self.total > budget
+
+
+class FrameProfiler:
+    """update/draw とその下の処理ごとの時間、pyxel の描画関数の呼び出し回数をフレームごとに記録する
+
+    watch() で時間を測るメソッドを、watch_calls() で回数を数える関数を登録しておき、start() で
+    計測付きのものに差し替え、stop() で元に戻す。計測していない間は wrap() で包んだ update/draw が
+    本体を呼ぶだけなので、HUD を出していなければ描画関数の呼び出しに手間は足さない。
+    """
+
+    def __init__(self, history=FRAME_HISTORY, budget=FRAME_BUDGET):
+        self.budget = budget
+        self.frames = deque(maxlen=history)
+        self.times = defaultdict(float)
+        self.calls = Counter()
+        self.watched = []  # start() で時間を測る (obj, メソッド名の並び)
+        self.counted = [(pyxel, COUNTED_CALLS)]  # start() で回数を数える (モジュール, 関数名の並びか {関数名: 表示名})
+        self.restore = []  # stop() で元に戻す処理
+        self.visible = False  # 計測中（HUD を出している）か
+
+    # ---- 計測の取り付け ----
+
+    def timed(self, name, func):
+        times = self.times
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                times[name] += time.perf_counter() - start
+
+        return wrapper
+
+    def instrument(self, obj, names):
+        """obj のメソッド names を計測付きに差し替える（インスタンス属性で上書きし、stop() で消す）"""
+        for name in names:
+            setattr(obj, name, self.timed(name, getattr(obj, name)))
+            self.restore.append(lambda name=name: delattr(obj, name))
+
+    def count_calls(self, module=pyxel, names=COUNTED_CALLS):
+        """module の関数の呼び出し回数を数える（names が辞書なら値の名前で数える）"""
+        calls = self.calls
+        if not isinstance(names, dict):
+            names = {name: name for name in names}
+        for name, label in names.items():
+            func = getattr(module, name)
+
+            def counter(*args, _func=func, _label=label, **kwargs):
+                calls[_label] += 1
+                return _func(*args, **kwargs)
+
+            setattr(module, name, counter)
+            self.restore.append(lambda name=name, func=func: setattr(module, name, func))
+
+    def watch(self, obj, names):
+        """start() で obj のメソッド names の時間を測るようにする"""
+        self.watched.append((obj, names))
+
+    def watch_calls(self, module, names):
+        """start() で module の関数 names の呼び出し回数を数えるようにする"""
+        self.counted.append((module, names))
+
+    def start(self):
+        if self.visible:
+            return
+        for obj, names in self.watched:
+            self.instrument(obj, names)
+        for module, names in self.counted:
+            self.count_calls(module, names)
+        self.frames.clear()
+        self.times.clear()
+        self.calls.clear()
+        self.visible = True
+
+    def stop(self):
+        while self.restore:
+            self.restore.pop()()
+        self.visible = False
+
+    def toggle(self):
+        if self.visible:
+            self.stop()
+        else:
+            self.start()
+
+    def wrap(self, update, draw):
+        """pyxel.run に渡す (update, draw) を返す
+
+        計測中は update と draw の時間を測り、描き終わりにフレームを締めて HUD を重ねる。
+        """
+        timed_update = self.timed("update", update)
+        timed_draw = self.timed("draw", draw)
+
+        @wraps(update)
+        def run_update():
+            if self.visible:
+                timed_update()
+            else:
+                update()
+
+        @wraps(draw)
+        def run_draw():
+            if not self.visible:
+                draw()
+                return
+            timed_draw()
+            self.end_frame()
+            self.draw_overlay()
+            self.calls.clear()  # HUD 自体の描画は数えない
+
+        return run_update, run_draw
+
+    def end_frame(self):
+        record = FrameRecord(dict(self.times), dict(self.calls))
+        self.frames.append(record)
+        self.times.clear()
+        return record
+
+    # ---- 集計 ----
+
+    def averages(self):
+        """処理名 -> 直近フレームの平均秒数（時間の長い順）"""
+        totals = defaultdict(float)
+        for record in self.frames:
+            for name, seconds in record.times.items():
+                totals[name] += seconds
+        count = max(1, len(self.frames))
+        return sorted(((name, total / count) for name, total in totals.items()), key=lambda item: -item[1])
+
+    def over_budget_count(self):
+        return sum(record.over_budget(self.budget) for record in self.frames)
+
+    # ---- 表示 ----
+
+    def draw_overlay(self, x=136, y=4, width=116, rows=8):
+        if not self.frames:
+            return
+        last = self.frames[-1]
+        worst = max(record.total for record in self.frames)
+        lines = [
+            f"frame {last.total * 1000:5.1f}ms max {worst * 1000:5.1f}",
+            f"over {self.budget * 1000:.0f}ms: {self.over_budget_count()}/{len(self.frames)}",
+            f"rect {last.calls.get('rect', 0) + last.calls.get('rectb', 0)} text {last.calls.get('text', 0)}"
+            f" blt {last.calls.get('blt', 0)}",
+        ]
+        for name, seconds in self.averages()[:rows]:
+            lines.append(f"{name[:18]:18}{seconds * 1000:5.1f}")
+
+        graph_height = 16
+        height = len(lines) * 7 + graph_height + 8
+        pyxel.rect(x, y, width, height, 0)
+        pyxel.rectb(x, y, width, height, 5)
+        for i, line in enumerate(lines):
+            pyxel.text(x + 3, y + 3 + i * 7, line, 8 if i == 0 and last.over_budget(self.budget) else 7)
+
+        # 直近フレームの合計時間の棒グラフ（予算の2倍で頭打ち、予算超えは赤）
+        base = y + height - 3
+        budget_y = base - graph_height // 2
+        pyxel.line(x + 2, budget_y, x + width - 3, budget_y, 1)
+        for i, record in enumerate(list(self.frames)[-(width - 4) // 2:]):
+            bar = min(graph_height, int(record.total / self.budget * graph_height / 2))
+            color = 8 if record.over_budget(self.budget) else 11
+            pyxel.line(x + 2 + i * 2, base, x + 2 + i * 2, base - bar, color)
@@ -0,0 +1,230 @@
+import numpy as np
+import pyxel
+
+from grid import DOWN_STAIRS, FLOOR, UP_STAIRS, WALL
+
+# タイルごとの表示色
+TILE_COLORS = {WALL: 5, FLOOR: 0, UP_STAIRS: 11, DOWN_STAIRS: 8}
+
+CHUNK_CELLS = 16  # キャッシュ画像1枚あたりのマス数（縦横）
+
+# オートマップの色。縮小するときは重なったマスのうち順位（この並び）の高いものを残す
+AUTOMAP_TILES = [None, WALL, FLOOR, UP_STAIRS, DOWN_STAIRS]  # None は未踏破
+AUTOMAP_COLORS = [0, 5, 13, 11, 8]
+ZOOM_LEVELS = [8, 4, 2, 1, 1 / 2, 1 / 4, 1 / 8]  # 1マスあたりのピクセル数
+HEX_DIGITS = bytes.maketrans(bytes(range(16)), b"0123456789abcdef")
+
+
+def newly_explored(explored, drawn, cell_count):
+    """explored で判明していて drawn にはまだ無いマスの一次元添字（bit = y * width + x）"""
+    new = np.frombuffer(bytes(explored.bits), dtype=np.uint8) & ~np.frombuffer(bytes(drawn), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(new, bitorder="little")[:cell_count])
+
+
+class Camera:
+    """プレイヤーを追いかける表示範囲（マス単位）。マップが画面より小さければ動かない"""
+
+    def __init__(self, view_width, view_height, map_width, map_height):
+        self.view_width = view_width
+        self.view_height = view_height
+        self.map_width = map_width
+        self.map_height = map_height
+        self.x = 0  # 表示範囲の左上（マス）
+        self.y = 0
+
+    def follow(self, x, y):
+        """(x, y) が中央に来るように動かす（マップの端では止まる）"""
+        self.x = max(0, min(x - self.view_width // 2, self.map_width - self.view_width))
+        self.y = max(0, min(y - self.view_height // 2, self.map_height - self.view_height))
+
+    def visible_rect(self):
+        """表示範囲のマス (x0, y0, x1, y1)（両端を含む）"""
+        return (self.x, self.y,
+                min(self.map_width, self.x + self.view_width) - 1,
+                min(self.map_height, self.y + self.view_height) - 1)
+
+    def is_visible(self, x, y):
+        return self.x <= x < self.x + self.view_width and self.y <= y < self.y + self.view_height
+
+    def to_screen(self, x, y, tile_size):
+        """マス座標を画面のピクセル座標に変換"""
+        return (x - self.x) * tile_size, (y - self.y) * tile_size
+
+
+class FloorImage:
+    """フロアを CHUNK_CELLS 四方ごとの Image に描いておき、新しく判明したマスだけ描き足す
+
+    画像は判明したマスを含むチャンクだけ作る。描画は表示範囲にかかるチャンクを blt するだけなので、
+    マップがどれだけ大きくても1フレームの転送回数は変わらない。
+    """
+
+    def __init__(self, grid, explored, tile_size):
+        self.grid = grid
+        self.explored = explored  # ExploredMap
+        self.tile_size = tile_size
+        self.chunks = {}  # (チャンク x, チャンク y) -> Image
+        self.drawn = bytearray(len(explored.bits))  # 描画済みのマス（explored と同じビット配置）
+        self.sync()
+
+    def chunk(self, cx, cy):
+        image = self.chunks.get((cx, cy))
+        if image is None:
+            size = CHUNK_CELLS * self.tile_size
+            image = pyxel.Image(size, size)
+            image.cls(0)  # 未踏破は暗闇
+            self.chunks[(cx, cy)] = image
+        return image
+
+    def sync(self):
+        """explored と描画済みの差分だけ描く"""
+        bits = self.explored.bits
+        if bits == self.drawn:
+            return
+        cells = newly_explored(self.explored, self.drawn, self.grid.width * self.grid.height)
+        width, size, tiles = self.grid.width, self.tile_size, self.grid.tiles
+        for i in cells.tolist():
+            x, y = i % width, i // width
+            image = self.chunk(x // CHUNK_CELLS, y // CHUNK_CELLS)
+            image.rect(x % CHUNK_CELLS * size, y % CHUNK_CELLS * size, size, size,
+                       TILE_COLORS.get(int(tiles[y, x]), 0))
+        self.drawn = bytearray(bits)
+
+    def draw(self, camera):
+        """camera の表示範囲にかかるチャンクだけを転送する"""
+        self.sync()
+        x0, y0, x1, y1 = camera.visible_rect()
+        size = CHUNK_CELLS * self.tile_size
+        for cy in range(y0 // CHUNK_CELLS, y1 // CHUNK_CELLS + 1):
+            for cx in range(x0 // CHUNK_CELLS, x1 // CHUNK_CELLS + 1):
+                image = self.chunks.get((cx, cy))
+                if image is not None:
+                    sx, sy = camera.to_screen(cx * CHUNK_CELLS, cy * CHUNK_CELLS, self.tile_size)
+                    pyxel.blt(sx, sy, image, 0, 0, size, size)
+
+
+class AutoMap:
+    """踏破済みのマスを縮尺ごとの画像にしておくオートマップ
+
+    1マス1ピクセル以下の縮尺は、フロア全体の画像を1枚ずつ持つ（初めて表示した縮尺だけ作る）。
+    小さい縮尺は、マスの順位を 2^k 四方で最大値プールして作る。新しく判明したマスは
+    その範囲のピクセルだけ描き直すので、表示中は毎フレーム blt 1回で済む。
+    拡大した縮尺はフロア全体だと縮尺の2乗倍の大きさになるので、表示枠の分だけを作り、
+    表示位置が変わるか新しいマスが判明したときに作り直す。
+    """
+
+    def __init__(self, grid, explored, levels=ZOOM_LEVELS):
+        self.grid = grid
+        self.explored = explored  # ExploredMap
+        self.levels = levels
+        rank = np.zeros(256, dtype=np.uint8)
+        for i, tile in enumerate(AUTOMAP_TILES[1:], 1):
+            rank[tile] = i
+        self.tile_ranks = rank[grid.tiles]  # 判明したときに入る順位
+        self.ranks = np.zeros((grid.height, grid.width), dtype=np.uint8)  # 判明済みのマスの順位（未踏破は 0）
+        self.colors = np.array(AUTOMAP_COLORS, dtype=np.uint8)
+        self.images = {}  # 縮尺の番号 -> Image（1マス1ピクセル以下の縮尺だけ）
+        self.zoomed = None  # 拡大表示の画像 Image
+        self.zoomed_key = None  # その画像の (縮尺の番号, u, v, 幅, 高さ)
+        self.drawn = bytearray(len(explored.bits))
+
+    def fit_level(self, width, height):
+        """width x height にフロア全体が収まる一番大きい縮尺の番号"""
+        for i, scale in enumerate(self.levels):
+            if self.grid.width * scale <= width and self.grid.height * scale <= height:
+                return i
+        return len(self.levels) - 1
+
+    def pooled(self, step):
+        """順位を step 四方ごとの最大値にまとめた配列"""
+        h, w = self.ranks.shape
+        padded = np.zeros((-(-h // step) * step, -(-w // step) * step), dtype=np.uint8)
+        padded[:h, :w] = self.ranks
+        return padded.reshape(padded.shape[0] // step, step, padded.shape[1] // step, step).max(axis=(1, 3))
+
+    def level_pixels(self, level):
+        """縮尺 level（1マス1ピクセル以下）の画像全体の色番号"""
+        scale = self.levels[level]
+        ranks = self.ranks if scale == 1 else self.pooled(round(1 / scale))
+        return self.colors[ranks]
+
+    def image(self, level):
+        """縮尺 level（1マス1ピクセル以下）のフロア全体の画像"""
+        image = self.images.get(level)
+        if image is None:
+            self.sync()
+            image = _image_from_pixels(self.level_pixels(level))
+            self.images[level] = image
+        return image
+
+    def zoomed_image(self, level, u, v, width, height):
+        """拡大した縮尺 level の地図のうち、ピクセル (u, v) から width x height の部分の画像"""
+        self.sync()
+        key = (level, u, v, width, height)
+        if self.zoomed_key != key:
+            scale = self.levels[level]
+            # 枠にかかるマスだけを拡大し、端のはみ出しを切り落とす
+            cx, cy = u // scale, v // scale
+            ranks = self.ranks[cy:(v + height - 1) // scale + 1, cx:(u + width - 1) // scale + 1]
+            ranks = np.repeat(np.repeat(ranks, scale, axis=0), scale, axis=1)
+            pixels = self.colors[ranks[v - cy * scale:, u - cx * scale:][:height, :width]]
+            if self.zoomed is None or (self.zoomed.width, self.zoomed.height) != (width, height):
+                self.zoomed = _image_from_pixels(pixels)
+            else:
+                _set_pixels(self.zoomed, pixels)
+            self.zoomed_key = key
+        return self.zoomed
+
+    def sync(self):
+        """新しく判明したマスを順位の配列と作成済みの画像に反映する"""
+        if self.explored.bits == self.drawn:
+            return
+        cells = newly_explored(self.explored, self.drawn, self.grid.width * self.grid.height)
+        self.drawn = bytearray(self.explored.bits)
+        ys, xs = np.divmod(cells, self.grid.width)
+        self.ranks[ys, xs] = self.tile_ranks[ys, xs]
+        self.zoomed_key = None  # 拡大表示は次に描くときに作り直す
+        for level, image in self.images.items():
+            scale = self.levels[level]
+            if scale == 1:
+                for x, y in zip(xs.tolist(), ys.tolist()):
+                    image.pset(x, y, int(self.colors[self.ranks[y, x]]))
+            else:
+                step = round(1 / scale)
+                for px, py in set(zip((xs // step).tolist(), (ys // step).tolist())):
+                    block = self.ranks[py * step:(py + 1) * step, px * step:(px + 1) * step]
+                    image.pset(px, py, int(self.colors[block.max()]))
+
+    def draw(self, x, y, width, height, level, cx, cy):
+        """縮尺 level の地図を (x, y, width, height) の枠に、マス (cx, cy) が中央に来るように描く
+
+        戻り値は (cx, cy) の左上の画面座標。
+        """
+        self.sync()
+        scale = self.levels[level]
+        map_width = self.grid.width * scale if scale >= 1 else -(-self.grid.width // round(1 / scale))
+        map_height = self.grid.height * scale if scale >= 1 else -(-self.grid.height // round(1 / scale))
+        # 地図が枠より小さければ中央に置き、大きければ (cx, cy) を中心に切り出す（端では止める）
+        ox = max(0, (width - map_width) // 2)
+        oy = max(0, (height - map_height) // 2)
+        u = max(0, min(int((cx + 0.5) * scale) - width // 2, map_width - width))
+        v = max(0, min(int((cy + 0.5) * scale) - height // 2, map_height - height))
+        w, h = min(width, map_width), min(height, map_height)
+        if scale > 1:
+            pyxel.blt(x + ox, y + oy, self.zoomed_image(level, u, v, w, h), 0, 0, w, h)
+        else:
+            pyxel.blt(x + ox, y + oy, self.image(level), u, v, w, h)
+        return x + ox + int(cx * scale) - u, y + oy + int(cy * scale) - v
+
+
+def _set_pixels(image, pixels):
+    """色番号の二次元配列を image の左上に書き込む"""
+    h, w = pixels.shape
+    text = pixels.tobytes().translate(HEX_DIGITS).decode()
+    image.set(0, 0, [text[y * w:(y + 1) * w] for y in range(h)])
+
+
+def _image_from_pixels(pixels):
+    """色番号の二次元配列と同じ大きさの Image"""
+    image = pyxel.Image(pixels.shape[1], pixels.shape[0])
+    _set_pixels(image, pixels)
+    return image
@@ -0,0 +1,68 @@
+class SpatialIndex:
+    """マス座標ごとに敵や宝箱を登録しておく空間ハッシュ（検索・削除とも O(1)）"""
+
+    def __init__(self):
+        self.cells = {}  # (x, y) -> {物: None}（挿入順を保つ集合として使う）
+        self.positions = {}  # 物 -> (x, y)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __iter__(self):
+        return iter(list(self.positions))
+
+    def __contains__(self, entity):
+        return entity in self.positions
+
+    def add(self, entity, x, y):
+        if entity in self.positions:
+            self.remove(entity)
+        self.positions[entity] = (x, y)
+        self.cells.setdefault((x, y), {})[entity] = None
+
+    def remove(self, entity):
+        cell = self.positions.pop(entity)
+        bucket = self.cells[cell]
+        del bucket[entity]
+        if not bucket:
+            del self.cells[cell]
+
+    def discard(self, entity):
+        if entity in self.positions:
+            self.remove(entity)
+
+    def move(self, entity, x, y):
+        self.remove(entity)
+        self.add(entity, x, y)
+
+    def position(self, entity):
+        return self.positions[entity]
+
+    def at(self, x, y):
+        """(x, y) にいる物のリスト"""
+        return list(self.cells.get((x, y), ()))
+
+    def first_at(self, x, y):
+        """(x, y) にいる物を1つ返す（いなければ None）"""
+        bucket = self.cells.get((x, y))
+        return next(iter(bucket)) if bucket else None
+
+    def within(self, x, y, radius):
+        """(x, y) から radius マス以内（チェビシェフ距離）にいる物のリスト"""
+        return self.in_rect(x - radius, y - radius, x + radius, y + radius)
+
+    def in_rect(self, x0, y0, x1, y1):
+        """(x0, y0)〜(x1, y1)（両端を含む）の矩形内にいる物のリスト"""
+        found = []
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= len(self.cells):
+            for cy in range(y0, y1 + 1):
+                for cx in range(x0, x1 + 1):
+                    bucket = self.cells.get((cx, cy))
+                    if bucket:
+                        found.extend(bucket)
+        else:
+            # 範囲より登録マスの方が少なければ登録マスを直接調べる
+            for (cx, cy), bucket in self.cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    found.extend(bucket)
+        return found
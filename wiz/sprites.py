@@ -0,0 +1,45 @@
+import os
+
+import pyxel
+
+# スプライトの画像（イメージバンク 0）。pyxel edit wiz.pyxres で編集できる
+ATLAS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wiz.pyxres")
+ATLAS_BANK = 0
+
+MAP_SPRITE_SIZE = 8  # マップ上の敵・宝箱（上端の列に 8x8 で並べてある）
+BATTLE_SPRITE_SIZE = 32  # 戦闘画面の敵（y=16 から 32x32 で並べてある）
+
+SPRITE_NAMES = ["Skeleton", "Slime", "Goblin", "Minotaur", "Dragon", "DemonLord", "Chest"]
+MAP_SPRITES = {name: (i * MAP_SPRITE_SIZE, 0) for i, name in enumerate(SPRITE_NAMES)}
+BATTLE_SPRITES = {name: (i * BATTLE_SPRITE_SIZE, 16) for i, name in enumerate(SPRITE_NAMES[:-1])}
+
+
+def load_atlas():
+    """起動時に1回だけスプライトの画像を読み込む"""
+    pyxel.load(ATLAS_FILE, exclude_tilemaps=True, exclude_sounds=True, exclude_musics=True)
+
+
+class SpriteBatch:
+    """1フレーム分のスプライトを種類ごとにまとめて描く
+
+    add() では座標を種類ごとの一覧に積むだけで、draw() で種類ごとに切り出し位置を1回だけ引き、
+    同じ画像から続けて blt する。
+    """
+
+    def __init__(self, sprites, size, bank=ATLAS_BANK, colkey=0):
+        self.sprites = sprites  # 種類 -> 画像内の (u, v)
+        self.size = size
+        self.bank = bank
+        self.colkey = colkey
+        self.groups = {}  # 種類 -> [(x, y), ...]
+
+    def add(self, kind, x, y):
+        self.groups.setdefault(kind, []).append((x, y))
+
+    def draw(self):
+        blt, bank, size, colkey = pyxel.blt, self.bank, self.size, self.colkey
+        for kind, positions in self.groups.items():
+            u, v = self.sprites[kind]
+            for x, y in positions:
+                blt(x, y, bank, u, v, size, size, colkey)
+        self.groups.clear()
@@ -0,0 +1,185 @@
+from abc import ABC, abstractmethod
+
+import pyxel
+
+text_cache = None  # font.TextCache。use_text_cache() で設定すると文字列は画像キャッシュから貼る
+
+
+def use_text_cache(cache):
+    global text_cache
+    text_cache = cache
+
+
+def draw_text(image, x, y, s, col):
+    if text_cache is None:
+        image.text(x, y, s, col)
+    else:
+        text_cache.draw(image, x, y, s, col)
+
+
+class Widget(ABC):
+    """UI 部品の基底。set() で値が変わったときだけ dirty になる（座標は画面座標）"""
+
+    def __init__(self, x, y, **props):
+        self.x = x
+        self.y = y
+        self.props = {"visible": True, **props}
+        self.dirty = True
+
+    def set(self, **props):
+        for key, value in props.items():
+            if self.props.get(key) != value:
+                self.props[key] = value
+                self.dirty = True
+
+    @abstractmethod
+    def render(self, image, ox, oy):
+        """image に描く（ox, oy は image の左上の画面座標）"""
+
+
+class Box(Widget):
+    """塗りつぶしの四角（border を指定すると枠線も描く）"""
+
+    def __init__(self, x, y, width, height, color=1, border=None):
+        super().__init__(x, y, width=width, height=height, color=color, border=border)
+
+    def render(self, image, ox, oy):
+        p = self.props
+        image.rect(self.x - ox, self.y - oy, p["width"], p["height"], p["color"])
+        if p["border"] is not None:
+            image.rectb(self.x - ox, self.y - oy, p["width"], p["height"], p["border"])
+
+
+class Label(Widget):
+    def __init__(self, x, y, text="", color=7):
+        super().__init__(x, y, text=text, color=color)
+
+    def render(self, image, ox, oy):
+        draw_text(image, self.x - ox, self.y - oy, self.props["text"], self.props["color"])
+
+
+class Bar(Widget):
+    """HP などの割合バー"""
+
+    def __init__(self, x, y, width, height, ratio=1.0, color=11, back_color=8):
+        super().__init__(x, y, width=width, height=height, ratio=ratio, color=color, back_color=back_color)
+
+    def render(self, image, ox, oy):
+        p = self.props
+        ratio = max(0.0, min(1.0, p["ratio"]))
+        image.rect(self.x - ox, self.y - oy, p["width"], p["height"], p["back_color"])
+        image.rect(self.x - ox, self.y - oy, int(p["width"] * ratio), p["height"], p["color"])
+
+
+class Sprite(Widget):
+    """イメージバンクの (u, v) から切り出した絵（色 colkey は透明）"""
+
+    def __init__(self, x, y, width, height, u=0, v=0, bank=0, colkey=0):
+        super().__init__(x, y, width=width, height=height, u=u, v=v, bank=bank, colkey=colkey)
+
+    def render(self, image, ox, oy):
+        p = self.props
+        image.blt(self.x - ox, self.y - oy, p["bank"], p["u"], p["v"], p["width"], p["height"], p["colkey"])
+
+
+class ListView(Widget):
+    """選択中の行に "> " を付けて並べる一覧"""
+
+    def __init__(self, x, y, items=(), selected=0, spacing=10, color=7):
+        super().__init__(x, y, items=tuple(items), selected=selected, spacing=spacing, color=color)
+
+    def set(self, **props):
+        if "items" in props:
+            props["items"] = tuple(props["items"])
+        super().set(**props)
+
+    def render(self, image, ox, oy):
+        p = self.props
+        for i, item in enumerate(p["items"]):
+            prefix = "> " if i == p["selected"] else "  "
+            draw_text(image, self.x - ox, self.y - oy + i * p["spacing"], prefix + item, p["color"])
+
+
+class Panel:
+    """部品をまとめて1枚の Image に描いておき、どれかが変わったときだけ描き直して blt する
+
+    bg=None の Panel は透明（色 0 を抜いて重ねる）。children は {名前: 部品} で、panel["名前"] で引ける。
+    """
+
+    def __init__(self, x, y, width, height, children, bg=1, border=7):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.bg = bg
+        self.border = border
+        self.children = children
+        self.image = pyxel.Image(width, height)
+        self.visible = True
+        self.dirty = True
+        self.redraws = 0  # 描き直した回数（確認用）
+
+    def __getitem__(self, name):
+        return self.children[name]
+
+    def set(self, **props):
+        """子の部品にまとめて値を渡す（{名前: {属性: 値}}）"""
+        for name, values in props.items():
+            self.children[name].set(**values)
+
+    def render(self):
+        image = self.image
+        image.cls(0 if self.bg is None else self.bg)
+        if self.border is not None:
+            image.rectb(0, 0, self.width, self.height, self.border)
+        for child in self.children.values():
+            if child.props["visible"]:
+                child.render(image, self.x, self.y)
+            child.dirty = False
+        self.dirty = False
+        self.redraws += 1
+
+    def draw(self):
+        if not self.visible:
+            return
+        if self.dirty or any(child.dirty for child in self.children.values()):
+            self.render()
+        if self.bg is None:
+            pyxel.blt(self.x, self.y, self.image, 0, 0, self.width, self.height, 0)
+        else:
+            pyxel.blt(self.x, self.y, self.image, 0, 0, self.width, self.height)
+
+
+class Screen:
+    """Panel を描く順に並べた1画面分のレイアウト
+
+    layout は (名前, (x, y, 幅, 高さ), 表示する状態, {部品名: 部品}, Panel の引数) の並び。
+    部品の座標は Panel の左上からの相対で書き、組み立て時に1回だけ画面座標に直す。
+    表示する状態が None の Panel は常に出す。状態が変わったときだけ表示する Panel を選び直すので、
+    毎フレームはキャッシュした並びを1回なめるだけ。
+    """
+
+    def __init__(self, layout):
+        self.panels = {}
+        self.entries = []
+        for name, (x, y, width, height), states, children, options in layout:
+            for child in children.values():
+                child.x += x
+                child.y += y
+            panel = Panel(x, y, width, height, children, **options)
+            self.panels[name] = panel
+            self.entries.append((panel, None if states is None else frozenset(states)))
+        self.state = self.visible = None
+
+    def __getitem__(self, name):
+        return self.panels[name]
+
+    def set_state(self, state):
+        if self.visible is None or state != self.state:
+            self.state = state
+            self.visible = [panel for panel, states in self.entries if states is None or state in states]
+
+    def draw(self, state=None):
+        self.set_state(state)
+        for panel in self.visible:
+            panel.draw()
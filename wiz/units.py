@@ -0,0 +1,62 @@
+# 敵・装備・プレイヤーの初期能力値（ゲーム本体と balance.py の両方から使う）
+
+PLAYER_HP = 100
+PLAYER_ATTACK = 10
+PLAYER_DEFENSE = 5
+PLAYER_SPEED = 5
+
+
+class Enemy:
+    def __init__(self, x, y, name, hp, attack, defense, speed, gold):
+        self.x = x
+        self.y = y
+        self.name = name
+        self.hp = hp
+        self.attack = attack
+        self.defense = defense  # 防御力を追加
+        self.speed = speed
+        self.gold = gold
+        self.max_hp = hp  # HP バーの基準
+        self.spawn_id = None  # フロア配置での番号（罠で湧いた敵は None）
+
+class Skeleton(Enemy):
+    def __init__(self, x, y):
+        super().__init__(x, y, "Skeleton", 40, 20, 10, 3, 20)  # 防御5を追加
+
+class Slime(Enemy):
+    def __init__(self, x, y):
+        super().__init__(x, y, "Slime", 20, 30, 15, 6, 10)  # 防御15を追加
+
+class Goblin(Enemy):
+    def __init__(self, x, y):
+        super().__init__(x, y, "Goblin", 30, 40, 4, 4, 30)  # 防御4を追加
+
+class Minotaur(Enemy):
+    def __init__(self, x, y):
+        super().__init__(x, y, "Minotaur", 100, 20, 15, 3, 100)  # 防御10を追加
+
+class Dragon(Enemy):
+    def __init__(self, x, y):
+        super().__init__(x, y, "Dragon", 200, 30, 20, 2, 300)  # 防御20を追加
+
+class DemonLord(Enemy):
+    def __init__(self, x, y):
+        super().__init__(x, y, "Demon Lord", 300, 50, 25, 5, 500)  # 防御25を追加
+
+class Equipment:
+    def __init__(self, name, slot, attack_bonus=0, defense_bonus=0, evasion=0):
+        self.name = name
+        self.slot = slot
+        self.attack_bonus = attack_bonus
+        self.defense_bonus = defense_bonus
+        self.evasion = evasion
+
+EQUIPMENT_ITEMS = {
+    "Long Sword": Equipment("Long Sword", "Right Hand", attack_bonus=15),
+    "Leather Armor": Equipment("Leather Armor", "Body", defense_bonus=9),
+    "Small Shield": Equipment("Small Shield", "Left Hand", defense_bonus=7, evasion=8),
+    "Iron Helmet": Equipment("Iron Helmet", "Head", defense_bonus=8),
+    "Boots": Equipment("Boots", "Legs", evasion=15)
+}
+
+ENEMY_TYPES = [Skeleton, Slime, Goblin, Minotaur, Dragon, DemonLord]
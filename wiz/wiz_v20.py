@@ -1,68 +1,100 @@
 import pyxel
 import random
 
+import ui
+
+from combat import (AutoPolicy, Initiative, damage, expected_damage, kill_probability, melee,
+                    precompute_damage_tables)
+from distance import FloorDistances
+from firstperson import FirstPersonView
+from floors import ExploredMap, Floor, FloorCache, FloorPrefetcher, FloorState, floor_rng
+from font import TextCache
+from grid import CellSampler, DOWN_STAIRS, UP_STAIRS
+from maze import generate_maze
+from profiler import FrameProfiler
+from render import AutoMap, Camera, FloorImage
+from spatial import SpatialIndex
+from sprites import BATTLE_SPRITE_SIZE, BATTLE_SPRITES, MAP_SPRITE_SIZE, MAP_SPRITES, SpriteBatch, load_atlas
+from ui import Bar, Box, Label, ListView, Panel, Screen, Sprite, use_text_cache
+from units import (ENEMY_TYPES, EQUIPMENT_ITEMS, PLAYER_ATTACK, PLAYER_DEFENSE, PLAYER_HP, PLAYER_SPEED,
+                   DemonLord, Dragon, Equipment, Goblin, Minotaur, Skeleton, Slime)
+
 # 向き（北、東、南、西）
 DIRECTIONS = ['N', 'E', 'S', 'W']
 DX = [0, 1, 0, -1]
 DY = [-1, 0, 1, 0]
 ARROWS = ['^', '>', 'v', '<']
 
-class Enemy:
-    def __init__(self, x, y, name, hp, attack, defense, speed, gold):
-        self.x = x
-        self.y = y
-        self.name = name
-        self.hp = hp
-        self.attack = attack
-        self.defense = defense  # 防御力を追加
-        self.speed = speed
-        self.gold = gold
-
-class Skeleton(Enemy):
-    def __init__(self, x, y):
-        super().__init__(x, y, "Skeleton", 40, 20, 10, 3, 20)  # 防御5を追加
-
-class Slime(Enemy):
-    def __init__(self, x, y):
-        super().__init__(x, y, "Slime", 20, 30, 15, 6, 10)  # 防御15を追加
-
-class Goblin(Enemy):
-    def __init__(self, x, y):
-        super().__init__(x, y, "Goblin", 30, 40, 4, 4, 30)  # 防御4を追加
-
-class Minotaur(Enemy):
-    def __init__(self, x, y):
-        super().__init__(x, y, "Minotaur", 100, 20, 15, 3, 100)  # 防御10を追加
-
-class Dragon(Enemy):
-    def __init__(self, x, y):
-        super().__init__(x, y, "Dragon", 200, 30, 20, 2, 300)  # 防御20を追加
-
-class DemonLord(Enemy):
-    def __init__(self, x, y):
-        super().__init__(x, y, "Demon Lord", 300, 50, 25, 5, 500)  # 防御25を追加
-
-class Equipment:
-    def __init__(self, name, slot, attack_bonus=0, defense_bonus=0, evasion=0):
-        self.name = name
-        self.slot = slot
-        self.attack_bonus = attack_bonus
-        self.defense_bonus = defense_bonus
-        self.evasion = evasion
-
-EQUIPMENT_ITEMS = {
-    "Long Sword": Equipment("Long Sword", "Right Hand", attack_bonus=15),
-    "Leather Armor": Equipment("Leather Armor", "Body", defense_bonus=9),
-    "Small Shield": Equipment("Small Shield", "Left Hand", defense_bonus=7, evasion=8),
-    "Iron Helmet": Equipment("Iron Helmet", "Head", defense_bonus=8),
-    "Boots": Equipment("Boots", "Legs", evasion=15)
-}
+TILE_SIZE = 16  # マップ表示の1マスの大きさ（ピクセル）
+VIEW_WIDTH = 16  # 画面に映すマス数
+VIEW_HEIGHT = 16
+
+# ダンジョンの大きさ（マス）
+MAP_WIDTH = 16
+MAP_HEIGHT = 16
+STAIRS_CLEARANCE = 2  # 階段とスタート地点の周りに敵・宝箱を置かない範囲（マス）
+BOSS_MIN_DISTANCE = 10  # 強敵は入口からこの歩数以上離して置く
+FLOOR_CACHE_SIZE = 8  # 迷路を保持しておくフロア数（追い出したフロアは種から再生成）
+AUTOMAP_RECT = (20, 28, 216, 184)  # オートマップの地図を描く範囲（x, y, 幅, 高さ）
+
+# メニューの項目
+TOWN_OPTIONS = ["Inn", "Shop", "Dungeon", "Guild"]
+GUILD_OPTIONS = ["Accept Quest", "Report Quest", "Return to Town"]
+MENU_TABS = ["Status", "Equipment", "Inventory"]
+CHEST_OPTIONS = ["Open", "Inspect", "Cancel"]
+BATTLE_COMMANDS = ["Attack", "Use Item", "Run", "Auto"]
+
+# F1 の HUD で時間を測る処理（状態ごとの update と画面ごとの draw。下請けの関数は含めない）
+PROFILED_HANDLERS = [
+    "update_town", "update_shop", "update_guild", "update_guild_quest", "update_dungeon", "update_automap",
+    "update_chest", "update_battle", "update_equip", "update_menu",
+    "draw_town", "draw_shop", "draw_guild", "draw_guild_quest", "draw_dungeon", "draw_automap",
+    "draw_dungeon_map", "draw_battle", "draw_menu",
+]
+
+POTION_HEAL = 20  # Potion で回復する HP
+AUTO_HEAL_BELOW = 0.3  # オートバトルは HP がこの割合を下回ったら Potion を使う
+AUTO_HEAL_RISK = 0.5  # 次の敵の一撃で倒れる確率がこれ以上でも Potion を使う
+
+
+def battle_layout():
+    """戦闘画面のレイアウト（部品の座標は枠の左上から。後ろほど手前に描く）"""
+    return [
+        ("enemy", (10, 10, 236, 60), None, {
+            "sprite": Sprite(30, 14, BATTLE_SPRITE_SIZE, BATTLE_SPRITE_SIZE),
+            "name": Label(90, 20),
+            "hp_bar": Bar(90, 30, 100, 5),
+        }, {}),
+        ("player", (10, 80, 120, 40), None, {
+            "hp": Label(10, 10),
+            "hp_bar": Bar(10, 20, 100, 5),
+        }, {}),
+        ("log", (10, 130, 236, 40), None, {
+            "log": Label(10, 10),
+        }, {}),
+        ("commands_title", (150, 70, 40, 8), ["player_action"], {
+            "title": Label(0, 0, "Commands:"),
+        }, {"bg": None, "border": None}),
+        ("commands", (140, 80, 106, 60), ["player_action"], {
+            "commands": ListView(10, 10, BATTLE_COMMANDS),
+            "preview": Label(10, 50, color=6),
+        }, {}),
+        ("items", (50, 50, 160, 100), ["item_selection"], {
+            "title": Label(10, 10, "Select Item:"),
+            "items": ListView(20, 30),
+        }, {}),
+    ]
 
 
 class App:
     def __init__(self):
         pyxel.init(256, 256, title="Wizardry-like")
+        load_atlas()
+        use_text_cache(TextCache())  # 日本語も描けるフォントを読み込み、文字列は画像にして使い回す
+        self.map_sprites = SpriteBatch(MAP_SPRITES, MAP_SPRITE_SIZE)
         self.floor = 0
+        self.map_width = MAP_WIDTH
+        self.map_height = MAP_HEIGHT
         self.player_x = 1
         self.player_y = 1
         self.player_dir = 0
@@ -71,19 +103,25 @@ class App:
         self.show_menu = False
         self.town_menu = 0
         self.gold = 100
-        self.player_hp = 100
-        self.player_max_hp = 100
-        self.player_speed = 5
+        self.player_hp = PLAYER_HP
+        self.player_max_hp = PLAYER_HP
+        self.player_speed = PLAYER_SPEED
         self.inventory = []
         self.shop_items = ["Potion", "Fireball Scroll", "Long Sword", "Leather Armor", "Small Shield"]
 
-        self.dungeon_maps = {}
-        self.enemies = []
+        self.run_seed = random.getrandbits(64)  # フロアの配置はこの種とフロア番号から決まる
+        self.dungeon_maps = FloorCache(FLOOR_CACHE_SIZE)
+        self.floor_states = {}  # フロアごとの変化分（開けた宝箱・倒した敵）
+        self.floor_views = FloorCache(FLOOR_CACHE_SIZE)  # フロアごとの (FloorImage, AutoMap)。再訪時は作り直さない
+        self.enemies = SpatialIndex()  # マス座標で引ける敵の一覧
         self.current_enemy = None
         self.battle_command = 0
         self.battle_log = ""
         self.battle_turn = "player"
         self.battle_state = "player_action"
+        self.initiative = None  # 戦闘中の行動順（素早さで決まる）
+        self.auto_policy = AutoPolicy(AUTO_HEAL_BELOW, AUTO_HEAL_RISK)
+        self.instant_battles = False  # True なら戦闘は始まった瞬間にオートで決着させ、結果の画面も出さない（headless 用）
         self.menu_selection = 0  # メニュー選択の初期化
         self.inventory_selection = 0  # インベントリ選択カーソルの初期化
         self.menu_active = False  # メニューの操作モードフラグ
@@ -94,7 +132,14 @@ class App:
         self.equip_item_selection = 0  # 装備アイテム選択カーソル
 
         # 敵リスト
-        self.enemy_types = [Skeleton, Slime, Goblin, Minotaur, Dragon, DemonLord]
+        self.enemy_types = ENEMY_TYPES
+        # 装備を全部付けたプレイヤーと全種類の敵の攻撃力・防御力までダメージの分布を先に数えておく
+        enemies = [enemy_class(0, 0) for enemy_class in ENEMY_TYPES]
+        precompute_damage_tables(
+            max([PLAYER_ATTACK + sum(item.attack_bonus for item in EQUIPMENT_ITEMS.values())]
+                + [enemy.attack for enemy in enemies]),
+            max([PLAYER_DEFENSE + sum(item.defense_bonus for item in EQUIPMENT_ITEMS.values())]
+                + [enemy.defense for enemy in enemies]))
         
         # 初期敵をランダムに設定
         self.set_random_enemy()
@@ -119,36 +164,31 @@ class App:
         }
 
         # 初期ステータス
-        self.base_attack = 10
-        self.base_defense = 5
+        self.base_attack = PLAYER_ATTACK
+        self.base_defense = PLAYER_DEFENSE
         self.base_evasion = 0
         self.attack_bonus = 0
         self.defense_bonus = 0
         self.evasion_bonus = 0
 
         self.update_combat_stats()
-        self.map_visibility = {}  # 各フロアのマッピング状況を保存
+        self.map_visibility = {}  # 各フロアのマッピング状況を保存（1マス1ビット）
+        self.first_person = False  # True なら一人称視点、False なら見下ろしマップ
+        self.first_person_view = FirstPersonView(16, 16, 224, 208)
+        self.show_automap = False  # M でオートマップを開く
+        self.floor_prefetcher = FloorPrefetcher(self.build_floor)  # 隣のフロアを裏で生成
+        self.build_ui()
         self.load_floor()
-        pyxel.run(self.update, self.draw)
-
-    def generate_maze(self, width, height):
-        maze = [[1 for _ in range(width)] for _ in range(height)]
-
-        def carve(x, y):
-            dirs = [(0, -2), (2, 0), (0, 2), (-2, 0)]
-            random.shuffle(dirs)
-            for dx, dy in dirs:
-                nx, ny = x + dx, y + dy
-                if 0 < nx < width and 0 < ny < height and maze[ny][nx] == 1:
-                    maze[ny - dy // 2][nx - dx // 2] = 0
-                    maze[ny][nx] = 0
-                    carve(nx, ny)
-
-        maze[1][1] = 0  # スタート地点
-        carve(1, 1)
-        maze[height - 2][width - 2] = 3  # 下層への階段
-        maze[1][width - 2] = 2  # 地上への階段
-        return maze
+
+        # F1 で処理ごとの時間と描画関数の呼び出し回数を重ねて表示する（計測の差し替えは表示している間だけ）
+        self.profiler = FrameProfiler()
+        self.profiler.watch(self, PROFILED_HANDLERS)
+        self.profiler.watch_calls(ui, {"draw_text": "text"})  # 文字は TextCache の blt ではなく文字列の数で数える
+        pyxel.run(*self.profiler.wrap(self.update, self.draw))
+
+    def generate_maze(self, width, height, rng=random):
+        # 再帰を使わない穴掘り法（maze.py）で生成
+        return generate_maze(width, height, rng)
 
     def set_random_enemy(self):
         """フロア移動時にランダムな敵を設定"""
@@ -182,46 +222,101 @@ class App:
 
 
 
-    def load_floor(self):
-        
-        if self.floor not in self.dungeon_maps:
-            self.dungeon_maps[self.floor] = self.generate_maze(16, 16)
-        self.dungeon_map = self.dungeon_maps[self.floor]
-        self.player_x, self.player_y = 1, 1
-        if self.floor not in self.map_visibility:
-            self.map_visibility[self.floor] = [[False for _ in range(16)] for _ in range(16)]
-        
-        # 初期位置を判明マスに
-        self.update_map_visibility(self.player_x, self.player_y)
+    def build_floor(self, index):
+        """フロアの迷路と敵・宝箱の配置を (run_seed, index) から生成（先読みスレッドからも呼ばれる）"""
+        rng = floor_rng(self.run_seed, index)  # 何度作り直しても同じフロアになる
+        dungeon_map = self.generate_maze(self.map_width, self.map_height, rng)
 
-        self.enemies = []
+        # 入口と階段からの距離場を先に作っておく（配置や敵の思考で使い回す）
+        distances = FloorDistances(dungeon_map)
+        entrance = distances.from_cell(1, 1)
+        distances.from_tile(UP_STAIRS)
+        distances.from_tile(DOWN_STAIRS)
+        distances.track_player(1, 1)  # 差分更新用の木もここ（先読みスレッド）で作っておく
 
-        # 強敵を1体配置（DemonLord, Dragon, Minotaurのどれかを選ぶ）
-        boss_class = random.choice([DemonLord, Dragon, Minotaur])
-        boss_x, boss_y = random.randint(2, 14), random.randint(2, 14)
-        self.enemies.append(boss_class(boss_x, boss_y))
+        # 置ける通路マスの一覧（スタート地点と階段の周りは除く）から重複なしで選ぶ
+        landmarks = [(1, 1), dungeon_map.find(UP_STAIRS), dungeon_map.find(DOWN_STAIRS)]
+        open_cells = dungeon_map.open_cells([p for p in landmarks if p], STAIRS_CLEARANCE)
+
+        enemy_spawns = []
+
+        # 強敵を1体配置（DemonLord, Dragon, Minotaurのどれかを選ぶ）。入口から離れたマスに限る
+        boss_class = rng.choice([DemonLord, Dragon, Minotaur])
+        steps = entrance.ravel()[open_cells]
+        far_cells = open_cells[steps >= min(BOSS_MIN_DISTANCE, steps.max(initial=0))]
+        for boss_x, boss_y in CellSampler(far_cells, self.map_width, rng).sample_many(1):
+            enemy_spawns.append((boss_class, boss_x, boss_y))
+            open_cells = open_cells[open_cells != boss_y * self.map_width + boss_x]
+        sampler = CellSampler(open_cells, self.map_width, rng)
 
         # 通常敵を5体配置
-        for _ in range(5):
-            x, y = random.randint(2, 14), random.randint(2, 14)
-            enemy_type = random.choice([Skeleton, Slime, Goblin])
-            self.enemies.append(enemy_type(x, y))
+        for x, y in sampler.sample_many(5):
+            enemy_type = rng.choice([Skeleton, Slime, Goblin])
+            enemy_spawns.append((enemy_type, x, y))
 
         # 宝箱を5つ配置
-        self.chests = [(random.randint(2, 14), random.randint(2, 14)) for _ in range(5)]
-        self.trapped_chests = {chest: random.choice([None, "alarm", "bomb"]) for chest in self.chests}
+        chests = sampler.sample_many(5)
+        trapped_chests = {chest: rng.choice([None, "alarm", "bomb"]) for chest in chests}
+        return Floor(index, dungeon_map, enemy_spawns, chests, trapped_chests, open_cells, distances)
+
+    def load_floor(self):
+        # キャッシュ → 先読み済み → その場で生成 の順に探す
+        floor = self.dungeon_maps.get(self.floor)
+        if floor is None:
+            floor = self.floor_prefetcher.take(self.floor)
+            self.dungeon_maps.put(self.floor, floor)
+        if self.floor not in self.floor_states:
+            self.floor_states[self.floor] = FloorState()
+        self.floor_state = self.floor_states[self.floor]
+        self.dungeon_map = floor.dungeon_map
+        self.floor_distances = floor.distances
+        self.player_x, self.player_y = 1, 1
+        self.floor_distances.track_player(self.player_x, self.player_y)  # 距離場の起点も入口へ戻す
+        if self.floor not in self.map_visibility:
+            self.map_visibility[self.floor] = ExploredMap(self.map_width, self.map_height)
+        
+        # 初期位置を判明マスに
+        self.update_map_visibility(self.player_x, self.player_y)
+        # マップ表示用の画像（判明したマスだけ描き足していく）とオートマップ（縮尺ごとの画像）
+        views = self.floor_views.get(self.floor)
+        if views is None:
+            explored = self.map_visibility[self.floor]
+            views = (FloorImage(self.dungeon_map, explored, TILE_SIZE), AutoMap(self.dungeon_map, explored))
+            self.floor_views.put(self.floor, views)
+        self.floor_image, self.automap = views
+        self.camera = Camera(VIEW_WIDTH, VIEW_HEIGHT, self.map_width, self.map_height)
+        # オートマップは最初はフロア全体が収まる縮尺にする
+        self.automap_level = self.automap.fit_level(*AUTOMAP_RECT[2:])
+
+        # 変化分を反映して敵と宝箱を並べる
+        self.enemies = SpatialIndex()
+        for spawn_id, (enemy_class, x, y) in enumerate(floor.enemy_spawns):
+            if spawn_id not in self.floor_state.removed_enemies:
+                enemy = enemy_class(x, y)
+                enemy.spawn_id = spawn_id
+                self.enemies.add(enemy, x, y)
+        self.chests = SpatialIndex()  # 宝箱は座標 (x, y) そのものを登録する
+        for chest in floor.chests:
+            if chest not in self.floor_state.opened_chests:
+                self.chests.add(chest, *chest)
+        self.trapped_chests = floor.trapped_chests
         self.chest_log = ""
         self.chest_opened = False
         self.chest_state = None
         self.chest_selection = 0
 
+        # 上下のフロアを裏で先読みしておく（0 は町なので除く）
+        self.floor_prefetcher.request([i for i in (self.floor + 1, self.floor - 1) if i < 0 and i not in self.dungeon_maps])
+
+    def remove_enemy(self, enemy):
+        """敵をフロアから取り除き、再訪時にも出ないよう記録する"""
+        self.enemies.discard(enemy)
+        if enemy.spawn_id is not None:
+            self.floor_state.removed_enemies.add(enemy.spawn_id)
+
     def update_map_visibility(self, x, y):
         """現在位置とその周囲のマスを可視化"""
-        for dx in range(-1, 2):
-            for dy in range(-1, 2):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < 16 and 0 <= ny < 16:
-                    self.map_visibility[self.floor][ny][nx] = True
+        self.map_visibility[self.floor].reveal_rect(x - 1, y - 1, x + 1, y + 1)
 
 
     def equip_item(self, slot, selected_item):
@@ -247,6 +342,8 @@ class App:
         self.update_combat_stats()  # ステータスを即時更新
     
     def update(self):
+        if pyxel.btnp(pyxel.KEY_F1):
+            self.profiler.toggle()
         if self.in_shop:
             self.update_shop()  # **ショップウィンドウの更新**
         elif self.in_guild:
@@ -273,6 +370,23 @@ class App:
         self.attack = self.base_attack + self.attack_bonus
         self.defense = self.base_defense + self.defense_bonus
         self.evasion = self.base_evasion + self.evasion_bonus
+
+    # combat.melee() に App をそのまま渡せるよう、プレイヤーの HP と素早さを Enemy と同じ名前でも引けるようにする
+    @property
+    def hp(self):
+        return self.player_hp
+
+    @hp.setter
+    def hp(self, value):
+        self.player_hp = value
+
+    @property
+    def max_hp(self):
+        return self.player_max_hp
+
+    @property
+    def speed(self):
+        return self.player_speed
     
 
     def update_town(self):
@@ -371,6 +485,9 @@ class App:
 
 
     def update_dungeon(self):
+        if self.show_automap:
+            self.update_automap()
+            return
         if pyxel.btnp(pyxel.KEY_W):
             self.move(1)
         elif pyxel.btnp(pyxel.KEY_S):
@@ -381,18 +498,17 @@ class App:
             self.turn(1)
         elif pyxel.btnp(pyxel.KEY_SPACE):
             self.use_tile()
+        elif pyxel.btnp(pyxel.KEY_V):
+            self.first_person = not self.first_person  # 一人称視点とマップを切り替え
+        elif pyxel.btnp(pyxel.KEY_M):
+            self.show_automap = True
         elif pyxel.btnp(pyxel.KEY_ESCAPE):
             self.in_town = True
             self.floor = 0
 
-        for enemy in self.enemies:
-            if self.player_x == enemy.x and self.player_y == enemy.y:
-                self.current_enemy = enemy
-                self.in_battle = True
-                self.battle_log = "Battle Start!"
-                self.battle_turn = "player"
-                self.battle_state = "player_action"
-                break
+        enemy = self.enemies.first_at(self.player_x, self.player_y)
+        if enemy:
+            self.start_battle(enemy)
         # 敵を倒したときに依頼を進める
         if self.in_battle and self.battle_state == "player_log" and self.current_enemy and self.current_enemy.hp <= 0:
             if self.current_quest and self.current_quest["type"] == "enemy_kill":
@@ -404,6 +520,14 @@ class App:
                 self.quest_progress += 1  # 宝箱回収数カウント
 
 
+    def update_automap(self):
+        if pyxel.btnp(pyxel.KEY_Q):
+            self.automap_level = max(0, self.automap_level - 1)  # 拡大
+        elif pyxel.btnp(pyxel.KEY_E):
+            self.automap_level = min(len(self.automap.levels) - 1, self.automap_level + 1)  # 縮小
+        elif pyxel.btnp(pyxel.KEY_M) or pyxel.btnp(pyxel.KEY_ESCAPE):
+            self.show_automap = False
+
     def update_chest(self):
         if self.chest_state == "selection":
             if pyxel.btnp(pyxel.KEY_UP):
@@ -423,9 +547,8 @@ class App:
                         # **HPが0にならないように明示的に設定**
                         new_enemy.hp = enemy_class(0, 0).hp  
 
-                        self.enemies.append(new_enemy)  # リストに追加
-                        self.current_enemy = new_enemy  # 戦闘対象に設定
-                        self.in_battle = True  # 戦闘開始
+                        self.enemies.add(new_enemy, new_enemy.x, new_enemy.y)  # 敵一覧に追加
+                        self.start_battle(new_enemy)  # 戦闘開始
                     
                     elif trap == "bomb":
                         damage = random.randint(10, 30)
@@ -444,7 +567,8 @@ class App:
                             self.gold += gold_found
                             self.chest_log = f"Found {gold_found} Gold!"
                     
-                    self.chests = [(cx, cy) for cx, cy in self.chests if (cx, cy) != (self.player_x, self.player_y)]
+                    self.chests.discard((self.player_x, self.player_y))
+                    self.floor_state.opened_chests.add((self.player_x, self.player_y))
                     self.chest_state = "result"
 
                 elif self.chest_selection == 1:  # 「調べる」
@@ -461,12 +585,8 @@ class App:
 
 
     def calculate_damage(self, attacker, defender):
-        min_damage = max(1, attacker.attack // 2)  # 最小ダメージは攻撃力の半分
-        max_damage = attacker.attack  # 最大ダメージは攻撃力
-        raw_damage = random.randint(min_damage, max_damage)  # ランダムな攻撃値
-        damage_reduction = min(0.8, defender.defense / 100)  # 防御の影響（最大80%カット）
-        final_damage = max(1, int(raw_damage * (1 - damage_reduction)))  # 計算後のダメージ
-        return final_damage
+        # ダメージの式は combat.py（一括で戦闘を回す resolve() と同じ式）
+        return damage(attacker.attack, defender.defense)
 
     def attack_enemy(self, enemy):
         damage = self.calculate_damage(self, enemy)
@@ -479,12 +599,62 @@ class App:
         self.show_message(f"You take {damage} damage!")
 
 
+    def start_battle(self, enemy):
+        self.current_enemy = enemy
+        self.in_battle = True
+        self.battle_log = "Battle Start!"
+        self.initiative = Initiative([(self, self.player_speed), (enemy, enemy.speed)])
+        self.next_turn()
+        if self.instant_battles:
+            self.auto_battle()
+            self.finish_battle()
+
+    def next_turn(self):
+        """素早さで決まる次の手番に進む（素早い方は続けて動けることがある）"""
+        if self.initiative.next() is self:
+            self.battle_turn = "player"
+            self.battle_state = "player_action"
+        else:
+            self.battle_turn = "enemy"
+            self.battle_state = "enemy_turn"
+
+    def auto_battle(self):
+        """今の手番から決着まで auto_policy で戦い（combat.melee）、結果をまとめてログに出す"""
+        enemy = self.current_enemy
+        start_hp = self.player_hp
+        result = melee([self], [enemy], policy=self.auto_policy, potions=self.inventory.count("Potion"),
+                       heal=POTION_HEAL, initiative=self.initiative,
+                       first=self if self.battle_turn == "player" else enemy)
+        for _ in range(result.potions_used):
+            self.inventory.remove("Potion")
+        summary = f"Auto: {result.player_turns} turns, dealt {result.dealt}, HP {start_hp} -> {self.player_hp}"
+        if result.winner == "players":
+            self.battle_log = f"{enemy.name} was defeated!\n{summary}"
+            self.battle_state = "victory"
+        elif result.winner == "enemies":
+            self.battle_log = f"You were defeated...\n{summary}"
+            self.battle_state = "game_over"
+        else:
+            self.battle_log = summary
+            self.next_turn()
+
+    def finish_battle(self):
+        """勝ち・負けの結果を閉じて戦闘を終える（負けたら HP を戻して町へ）"""
+        if self.battle_state == "victory":
+            self.remove_enemy(self.current_enemy)
+        else:
+            self.player_hp = self.player_max_hp  # **プレイヤーを復活（必要なら変更）**
+            self.in_town = True  # **町に戻る**
+        self.current_enemy = None  # **敵をリセット**
+        self.in_battle = False  # **戦闘を終了**
+        self.battle_state = "player_action"  # **状態を初期化**
+
     def update_battle(self):
         if self.battle_state == "player_action":
             if pyxel.btnp(pyxel.KEY_UP):
-                self.battle_command = (self.battle_command - 1) % 3
+                self.battle_command = (self.battle_command - 1) % len(BATTLE_COMMANDS)
             elif pyxel.btnp(pyxel.KEY_DOWN):
-                self.battle_command = (self.battle_command + 1) % 3
+                self.battle_command = (self.battle_command + 1) % len(BATTLE_COMMANDS)
             elif pyxel.btnp(pyxel.KEY_RETURN):
                 if self.battle_command == 0:  # Attack
                     final_damage = self.calculate_damage(self, self.current_enemy)
@@ -499,16 +669,18 @@ class App:
                         self.battle_log = "No items available!"
                 elif self.battle_command == 2:  # Run
                     self.battle_log = "Escaped!"
-                    self.enemies.remove(self.current_enemy)
+                    self.remove_enemy(self.current_enemy)
                     self.in_battle = False
+                elif self.battle_command == 3:  # Auto
+                    self.auto_battle()
         elif self.battle_state == "player_log":
-            # **Enterキーで敵のターンに進む**
+            # **Enterキーで次の手番に進む**
             if pyxel.btnp(pyxel.KEY_RETURN):
                 if self.current_enemy.hp <= 0:
                     self.battle_log = f"{self.current_enemy.name} was defeated!"
                     self.battle_state = "victory"
                 else:
-                    self.battle_state = "enemy_turn"
+                    self.next_turn()
 
         elif self.battle_state == "enemy_turn":
             final_damage = self.calculate_damage(self.current_enemy, self)
@@ -517,30 +689,17 @@ class App:
             self.battle_state = "enemy_log"
 
         elif self.battle_state == "enemy_log":
-            # **Enterキーでプレイヤーのターンに戻る**
+            # **Enterキーで次の手番に進む**
             if pyxel.btnp(pyxel.KEY_RETURN):
                 if self.player_hp <= 0:
                     self.battle_log = "You were defeated..."
                     self.battle_state = "game_over"
                 else:
-                    self.battle_state = "player_action"
+                    self.next_turn()
 
-        elif self.battle_state == "victory":
-            if pyxel.btnp(pyxel.KEY_RETURN):
-                # **敵が倒れた後に `self.current_enemy` をリセット**
-                if self.current_enemy in self.enemies:
-                    self.enemies.remove(self.current_enemy)
-                self.current_enemy = None  # **敵オブジェクトを削除**
-                self.in_battle = False  # **戦闘を終了**
-                self.battle_state = "player_action"  # **状態を初期化**
-
-        elif self.battle_state == "game_over":
+        elif self.battle_state in ("victory", "game_over"):
             if pyxel.btnp(pyxel.KEY_RETURN):
-                self.in_battle = False  # **戦闘を終了**
-                self.current_enemy = None  # **敵をリセット**
-                self.battle_state = "player_action"  # **状態をリセット**
-                self.player_hp = self.player_max_hp  # **プレイヤーを復活（必要なら変更）**
-                self.in_town = True  # **町に戻る**
+                self.finish_battle()
                 
     def update_equip(self):
         equipable_items = [item for item in self.inventory if isinstance(item, Equipment)]
@@ -564,10 +723,11 @@ class App:
     def move(self, direction):
         nx = self.player_x + DX[self.player_dir] * direction
         ny = self.player_y + DY[self.player_dir] * direction
-        if 0 <= nx < 16 and 0 <= ny < 16 and self.dungeon_map[ny][nx] != 1:
+        if self.dungeon_map.is_walkable(nx, ny):
             self.player_x = nx
             self.player_y = ny
             self.update_map_visibility(nx, ny)  # 移動時にマッピングを更新
+            self.floor_distances.track_player(nx, ny)  # プレイヤーからの距離場を差分更新
 
     def turn(self, direction):
         self.player_dir = (self.player_dir + direction) % 4
@@ -586,12 +746,83 @@ class App:
             self.load_floor()
 
         # 宝箱コマンドウィンドウを開く（即座に罠やアイテム取得をしない）
-        for cx, cy in self.chests:
-            if (self.player_x, self.player_y) == (cx, cy):
-                self.chest_state = "selection"  # ウィンドウを開く
-                self.chest_selection = 0  # カーソルをリセット
-                return  # 他の処理をしない
-
+        if self.chests.first_at(self.player_x, self.player_y):
+            self.chest_state = "selection"  # ウィンドウを開く
+            self.chest_selection = 0  # カーソルをリセット
+            return  # 他の処理をしない
+
+
+    def build_ui(self):
+        """画面ごとのパネルを作る（中身は draw_* で毎フレーム set() し、変わったときだけ描き直される）"""
+        tabs = {}
+        for i, tab in enumerate(MENU_TABS):
+            tabs[f"tab{i}"] = Box(20 + i * 80, 15, 70, 15, 5)
+            tabs[f"tab{i}_label"] = Label(35 + i * 80, 20, tab, 0)
+        self.ui = {
+            "town": Panel(0, 0, 256, 256, {
+                "title": Label(40, 20, "-- Town --"),
+                "options": ListView(20, 80, TOWN_OPTIONS, spacing=20),
+                "gold": Label(5, 240),
+            }, bg=None, border=None),
+            "shop": Panel(40, 40, 180, 120, {
+                "title": Label(90, 50, "-- Shop --"),
+                "items": ListView(60, 70),
+                "gold": Label(50, 150),
+            }),
+            # 依頼の進行度（y=160）が収まるよう枠を元より少し伸ばしている
+            "guild": Panel(40, 60, 180, 112, {
+                "title": Label(50, 70, "-- Guild --"),
+                "options": ListView(60, 90, GUILD_OPTIONS),
+                "quest_title": Label(50, 140, "Current Quest:"),
+                "quest": Label(50, 150),
+                "progress": Label(50, 160),
+            }),
+            "guild_quest": Panel(40, 60, 180, 100, {
+                "title": Label(50, 70, "-- Select Quest --"),
+                "quests": ListView(60, 90),
+            }),
+            "menu": Panel(0, 0, 256, 256, {
+                "background": Box(10, 10, 236, 236, 1),
+                **tabs,
+                "title": Label(40, 40),
+                # ステータスページ
+                "hp": Label(20, 60),
+                "hp_bar": Bar(20, 70, 100, 5),
+                "attack": Label(20, 80),
+                "defense": Label(20, 100),
+                "gold": Label(20, 130),
+                # 装備ページ
+                "slots_title": Label(20, 60, "Equipment Slots:"),
+                "slots": ListView(40, 80, spacing=15),
+                "attack_bonus": Label(20, 180),
+                "defense_bonus": Label(20, 195),
+                "evasion_bonus": Label(20, 210),
+                "equip_window": Box(60, 60, 130, 100, 1),
+                "equip_title": Label(70, 70, "Select Equipment:"),
+                "equip_items": ListView(80, 90, spacing=15),
+                # インベントリページ
+                "inventory_title": Label(20, 60, "Inventory:"),
+                "inventory": ListView(40, 80),
+                "message": Label(50, 220),
+                "help": Label(10, 240, "Press ENTER to use item, TAB to exit"),
+            }, bg=0, border=None),
+            "dungeon_status": Panel(0, 228, 256, 20, {
+                "facing": Label(16, 228),
+                "floor": Label(5, 240),
+                "gold": Label(100, 240),
+                "explored": Label(170, 240),
+            }, bg=None, border=None),
+            "automap": Panel(16, 16, 224, 208, {
+                "title": Label(22, 20),
+                "help": Label(22, 216, "Q/E: Zoom  M: Close"),
+            }),
+            "chest": Panel(40, 80, 180, 60, {
+                "prompt": Label(50, 90, "Open the chest?"),
+                "options": ListView(60, 110, CHEST_OPTIONS),
+                "log": Label(50, 100),
+            }),
+        }
+        self.battle_screen = Screen(battle_layout())
 
     def draw(self):
         pyxel.cls(0)
@@ -601,69 +832,62 @@ class App:
             self.draw_battle()
         elif self.in_shop:  # **ショップウィンドウの表示**
             self.draw_shop()
+        elif self.in_guild:
+            self.draw_guild()
         elif self.in_town:
             self.draw_town()
         else:
             self.draw_dungeon()
 
     def draw_menu(self):
-        pyxel.cls(0)
-        pyxel.rect(10, 10, 236, 236, 1)  # 背景
-        
-        # タブの描画
-        tabs = ["Status", "Equipment", "Inventory"]
-        self.menu_selection = max(0, min(self.menu_selection, len(tabs) - 1))
-        
-        for i, tab in enumerate(tabs):
-            color = 7 if i == self.menu_selection else 5
-            pyxel.rect(20 + i * 80, 15, 70, 15, color)
-            pyxel.text(35 + i * 80, 20, tab, 0)
-        
-        # 現在のページタイトルを強調（点滅）
-        if not self.menu_active or pyxel.frame_count % 30 < 15:
-            pyxel.text(40, 40, f"-- {tabs[self.menu_selection]} --", 7)
-        
-        # ページごとの内容を描画
-            #ステータスページ
-        if self.menu_selection == 0:  # ステータスページ
-            pyxel.text(20, 60, f"HP: {self.player_hp}/{self.player_max_hp}", 7)
-            pyxel.rect(20, 70, 100, 5, 8)  # 背景（赤）
-            pyxel.rect(20, 70, int(100 * (self.player_hp / self.player_max_hp)), 5, 11)  # HP（緑）
-            pyxel.text(20, 80, f"Attack: {self.attack} (+{self.attack_bonus})", 7)
-            pyxel.text(20, 100, f"Defense: {self.defense} (+{self.defense_bonus})", 7)
-            pyxel.text(20, 130, f"Gold: {self.gold}", 7)
-                # 装備ページの描画
-        if self.menu_selection == 1:
-            pyxel.text(20, 60, "Equipment Slots:", 7)
-            for i, (slot, item) in enumerate(self.equipment.items()):
-                prefix = "> " if i == self.equipment_selection else "  "
-                pyxel.text(40, 80 + i * 15, f"{prefix}{slot}: {item.name if item else 'None'}", 7)
-                    # 現在のボーナスを表示
-            pyxel.text(20, 180, f"Attack Bonus: {self.attack_bonus}", 7)
-            pyxel.text(20, 195, f"Defense Bonus: {self.defense_bonus}", 7)
-            pyxel.text(20, 210, f"Evasion Bonus: {self.evasion_bonus}", 7)
-        
-            if self.equip_mode:
-                pyxel.rect(60, 60, 130, 100, 1)  # 装備選択ウィンドウ
-                pyxel.text(70, 70, "Select Equipment:", 7)
-                equipable_items = [item for item in self.inventory if isinstance(item, Equipment)]
-                for i, item in enumerate(equipable_items):
-                    prefix = "> " if i == self.equip_item_selection else "  "
-                    pyxel.text(80, 90 + i * 15, f"{prefix}{item.name}", 7)
-                
-                prefix = "> " if self.equip_item_selection == len(equipable_items) else "  "
-                pyxel.text(80, 90 + len(equipable_items) * 15, f"{prefix}Remove Equipment", 7)
-
-        elif self.menu_selection == 2:  # インベントリページ
-            pyxel.text(20, 60, "Inventory:", 7)
-            for i, item in enumerate(self.inventory):
-                prefix = "> " if i == self.inventory_selection else "  "
-                pyxel.text(40, 80 + i * 10, prefix + (item.name if isinstance(item, Equipment) else str(item)), 7)
-        
-        if self.message:
-            pyxel.text(50, 220, self.message, 7)
+        panel = self.ui["menu"]
+        self.menu_selection = max(0, min(self.menu_selection, len(MENU_TABS) - 1))
+        page = self.menu_selection
 
-        pyxel.text(10, 240, "Press ENTER to use item, TAB to exit", 7)
+        # タブ（選択中は明るく）
+        for i in range(len(MENU_TABS)):
+            panel[f"tab{i}"].set(color=7 if i == page else 5)
+
+        # 現在のページタイトルを強調（点滅）
+        panel["title"].set(text=f"-- {MENU_TABS[page]} --",
+                           visible=not self.menu_active or pyxel.frame_count % 30 < 15)
+
+        # ステータスページ
+        status = page == 0
+        panel.set(
+            hp={"text": f"HP: {self.player_hp}/{self.player_max_hp}", "visible": status},
+            hp_bar={"ratio": self.player_hp / self.player_max_hp, "visible": status},
+            attack={"text": f"Attack: {self.attack} (+{self.attack_bonus})", "visible": status},
+            defense={"text": f"Defense: {self.defense} (+{self.defense_bonus})", "visible": status},
+            gold={"text": f"Gold: {self.gold}", "visible": status},
+        )
+
+        # 装備ページ
+        equip = page == 1
+        equip_window = equip and self.equip_mode
+        equipable_items = [item for item in self.inventory if isinstance(item, Equipment)]
+        panel.set(
+            slots_title={"visible": equip},
+            slots={"items": [f"{slot}: {item.name if item else 'None'}" for slot, item in self.equipment.items()],
+                   "selected": self.equipment_selection, "visible": equip},
+            attack_bonus={"text": f"Attack Bonus: {self.attack_bonus}", "visible": equip},
+            defense_bonus={"text": f"Defense Bonus: {self.defense_bonus}", "visible": equip},
+            evasion_bonus={"text": f"Evasion Bonus: {self.evasion_bonus}", "visible": equip},
+            equip_window={"visible": equip_window},
+            equip_title={"visible": equip_window},
+            equip_items={"items": [item.name for item in equipable_items] + ["Remove Equipment"],
+                         "selected": self.equip_item_selection, "visible": equip_window},
+        )
+
+        # インベントリページ
+        inventory = page == 2
+        panel.set(
+            inventory_title={"visible": inventory},
+            inventory={"items": [item.name if isinstance(item, Equipment) else str(item) for item in self.inventory],
+                       "selected": self.inventory_selection, "visible": inventory},
+            message={"text": self.message, "visible": bool(self.message)},
+        )
+        panel.draw()
 
     def update_menu(self):
         if self.message and pyxel.btnp(pyxel.KEY_RETURN):
@@ -731,7 +955,7 @@ class App:
                 elif pyxel.btnp(pyxel.KEY_RETURN):
                     item = self.inventory[self.inventory_selection]
                     if item == "Potion":
-                        self.player_hp = min(self.player_hp + 20, self.player_max_hp)
+                        self.player_hp = min(self.player_hp + POTION_HEAL, self.player_max_hp)
                         self.inventory.pop(self.inventory_selection)
                     elif item == "Fireball Scroll":
                         self.player_hp = max(0, self.player_hp - 10)
@@ -765,167 +989,137 @@ class App:
 
 
     def draw_town(self):
-        options = ["Inn", "Shop", "Dungeon", "Guild"]
-        pyxel.text(40, 20, "-- Town --", 7)
-        for i, option in enumerate(options):
-            prefix = "> " if i == self.town_menu else "  "
-            pyxel.text(20, 80 + i * 20, prefix + option, 7)
-        pyxel.text(5, 240, f"Gold: {self.gold}", 7)
+        panel = self.ui["town"]
+        panel.set(options={"selected": self.town_menu}, gold={"text": f"Gold: {self.gold}"})
+        panel.draw()
 
     def draw_shop(self):
-        pyxel.rect(40, 40, 180, 120, 1)  # 背景
-        pyxel.rectb(40, 40, 180, 120, 7)  # 枠線
-        pyxel.text(90, 50, "-- Shop --", 7)
-
-        for i, item in enumerate(self.shop_items):
-            prefix = "> " if i == self.menu_selection else "  "
-            pyxel.text(60, 70 + i * 10, f"{prefix}{item}", 7)
-
-        pyxel.text(60, 70 + len(self.shop_items) * 10, "> back" if self.menu_selection == len(self.shop_items) else "  戻る", 7)
-        pyxel.text(50, 150, f"Gold: {self.gold}", 7)
-
-
+        panel = self.ui["shop"]
+        panel.set(
+            items={"items": self.shop_items + ["戻る"], "selected": self.menu_selection},
+            gold={"text": f"Gold: {self.gold}"},
+        )
+        panel.draw()
 
     def draw_guild(self):
         if self.in_guild_quest:
             self.draw_guild_quest()
             return
 
-        pyxel.rect(40, 60, 180, 100, 1)  # 背景
-        pyxel.rectb(40, 60, 180, 100, 7)  # 枠
-        pyxel.text(50, 70, "-- Guild --", 7)
-
-        options = ["Accept Quest", "Report Quest", "Return to Town"]
-        for i, option in enumerate(options):
-            prefix = "> " if i == self.guild_selection else "  "
-            pyxel.text(60, 90 + i * 10, prefix + option, 7)
-        
-        if self.current_quest:
-            pyxel.text(50, 140, f"Current Quest:", 7)
-            pyxel.text(50, 150, self.current_quest["description"], 7)
-            pyxel.text(50, 160, f"Progress: {self.quest_progress}/{self.current_quest['count']}", 7)
+        panel = self.ui["guild"]
+        quest = self.current_quest
+        panel.set(
+            options={"selected": self.guild_selection},
+            quest_title={"visible": quest is not None},
+            quest={"text": quest["description"] if quest else "", "visible": quest is not None},
+            progress={"text": f"Progress: {self.quest_progress}/{quest['count']}" if quest else "",
+                      "visible": quest is not None},
+        )
+        panel.draw()
 
     def draw_guild_quest(self):
-        pyxel.rect(40, 60, 180, 100, 1)  # 背景
-        pyxel.rectb(40, 60, 180, 100, 7)  # 枠
-        pyxel.text(50, 70, "-- Select Quest --", 7)
-
-        for i, quest in enumerate(self.available_quests):
-            prefix = "> " if i == self.guild_quest_selection else "  "
-            pyxel.text(60, 90 + i * 10, prefix + quest["description"], 7)
-
-        # 「やめる」の選択肢を追加
-        prefix = "> " if self.guild_quest_selection == len(self.available_quests) else "  "
-        pyxel.text(60, 90 + len(self.available_quests) * 10, prefix + "Cancel", 7)
-
+        panel = self.ui["guild_quest"]
+        # 「やめる」の選択肢を最後に付ける
+        panel["quests"].set(items=[quest["description"] for quest in self.available_quests] + ["Cancel"],
+                            selected=self.guild_quest_selection)
+        panel.draw()
 
     def draw_dungeon(self):
-        tile_size = 16
-        for y, row in enumerate(self.dungeon_map):
-            for x, cell in enumerate(row):
-                color = 0
-                if cell == 1:
-                    color = 5
-                elif cell == 0:
-                    color = 0
-                elif cell == 2:
-                    color = 11
-                elif cell == 3:
-                    color = 8
-                pyxel.rect(x * tile_size, y * tile_size, tile_size, tile_size, color)
-
-                if not self.map_visibility[self.floor][y][x]:
-                    pyxel.rect(x * tile_size, y * tile_size, tile_size, tile_size, 0)  # 未踏破は暗闇
-                else:
-                    color = {1: 5, 0: 0, 2: 11, 3: 8}.get(cell, 0)
-                    pyxel.rect(x * tile_size, y * tile_size, tile_size, tile_size, color)
-
-        # 敵の描画
-        for enemy in self.enemies:
-            pyxel.rect(enemy.x * tile_size + 4, enemy.y * tile_size + 4, 8, 8, 8)
+        if self.first_person:
+            self.first_person_view.draw(self.dungeon_map, self.player_x, self.player_y, self.player_dir,
+                                        self.enemies, self.chests)
+        else:
+            self.draw_dungeon_map()
+        if self.show_automap:
+            self.draw_automap()
+
+        status = self.ui["dungeon_status"]
+        status.set(
+            facing={"text": f"Facing: {DIRECTIONS[self.player_dir]}", "visible": self.first_person},
+            floor={"text": f"Floor: {'Ground' if self.floor == 0 else 'BF' + str(abs(self.floor))}"},
+            gold={"text": f"Gold: {self.gold}"},
+            explored={"text": f"Explored: {int(self.map_visibility[self.floor].ratio() * 100)}%"},
+        )
+        status.draw()
 
-        # 宝箱の描画
-        for cx, cy in self.chests:
-            pyxel.rect(cx * tile_size + 4, cy * tile_size + 4, 8, 8, 10)
+        # 宝箱のウィンドウ表示
+        if self.chest_state:
+            selecting = self.chest_state == "selection"
+            chest = self.ui["chest"]
+            chest.set(
+                prompt={"visible": selecting},
+                options={"selected": self.chest_selection, "visible": selecting},
+                log={"text": self.chest_log, "visible": not selecting},
+            )
+            chest.draw()
+
+    def draw_automap(self):
+        scale = self.automap.levels[self.automap_level]
+        panel = self.ui["automap"]
+        panel["title"].set(text=f"Automap x{scale}" if scale >= 1 else f"Automap 1/{round(1 / scale)}")
+        panel.draw()
+        px, py = self.automap.draw(*AUTOMAP_RECT, self.automap_level, self.player_x, self.player_y)
+        size = max(2, int(scale))
+        pyxel.rect(px, py, size, size, 9)  # プレイヤーの位置
+
+    def draw_dungeon_map(self):
+        tile_size = TILE_SIZE
+        # カメラはプレイヤーを追いかけ、表示範囲の中だけを描く
+        self.camera.follow(self.player_x, self.player_y)
+        view = self.camera.visible_rect()
+
+        # マップはキャッシュした画像を転送するだけ（新しく判明したマスはその前に描き足される）
+        self.floor_image.draw(self.camera)
+
+        # 敵と宝箱は種類ごとにまとめてスプライトで描く
+        batch = self.map_sprites
+        for enemy in self.enemies.in_rect(*view):
+            sx, sy = self.camera.to_screen(enemy.x, enemy.y, tile_size)
+            batch.add(type(enemy).__name__, sx + 4, sy + 4)
+        for cx, cy in self.chests.in_rect(*view):
+            sx, sy = self.camera.to_screen(cx, cy, tile_size)
+            batch.add("Chest", sx + 4, sy + 4)
+        batch.draw()
 
         # プレイヤーの描画
-        px = self.player_x * tile_size + tile_size // 4
-        py = self.player_y * tile_size + tile_size // 4
+        px, py = self.camera.to_screen(self.player_x, self.player_y, tile_size)
+        px += tile_size // 4
+        py += tile_size // 4
         pyxel.text(px, py, ARROWS[self.player_dir], 9)
 
-        pyxel.text(5, 240, f"Floor: {'Ground' if self.floor == 0 else 'BF' + str(abs(self.floor))}", 7)
-        pyxel.text(100, 240, f"Gold: {self.gold}", 7)
-
-        # 宝箱のウィンドウ表示
-        if self.chest_state:
-            pyxel.rect(40, 80, 180, 60, 1)
-            pyxel.rectb(40, 80, 180, 60, 7)
-            if self.chest_state == "selection":
-                pyxel.text(50, 90, "Open the chest?", 7)
-                options = ["Open", "Inspect", "Cancel"]
-                for i, option in enumerate(options):
-                    prefix = "> " if i == self.chest_selection else "  "
-                    pyxel.text(60, 110 + i * 10, prefix + option, 7)
-            else:
-                pyxel.text(50, 100, self.chest_log, 7)
+    def command_preview(self, command):
+        """選んでいるコマンドの見込み（ダメージ分布の表から引くので乱数は振らない）"""
+        enemy = self.current_enemy
+        if command == "Attack":
+            expected = expected_damage(self.attack, enemy.defense)
+            kill = kill_probability(self.attack, enemy.defense, enemy.hp)
+            return f"~{expected:.1f} dmg {kill:.0%} kill"
+        if command == "Use Item" and "Potion" in self.inventory:
+            return f"Potion +{POTION_HEAL} HP"
+        if command == "Auto":
+            return self.auto_policy.describe()
+        return ""
 
     def draw_battle(self):
-        pyxel.text(40, 20, "-- Battle --", 7)
-        pyxel.rect(10, 10, 236, 60, 1)
-        pyxel.rectb(10, 10, 236, 60, 7)
-        pyxel.text(100, 30, f"Enemy: {self.current_enemy.name}", 7)
-
-
-
-        pyxel.rect(10, 80, 120, 40, 1)
-        pyxel.rectb(10, 80, 120, 40, 7)
-        pyxel.text(20, 90, f"HP: {self.player_hp}/{self.player_max_hp}", 7)
-        
+        screen = self.battle_screen
+        enemy = self.current_enemy
+        u, v = BATTLE_SPRITES[type(enemy).__name__]
+        screen["enemy"].set(
+            sprite={"u": u, "v": v},
+            name={"text": f"Enemy: {enemy.name}"},
+            hp_bar={"ratio": enemy.hp / enemy.max_hp},
+        )
+        screen["player"].set(
+            hp={"text": f"HP: {self.player_hp}/{self.player_max_hp}"},
+            hp_bar={"ratio": self.player_hp / self.player_max_hp},
+        )
+        screen["log"]["log"].set(text=self.battle_log)
         if self.battle_state == "player_action":
-            pyxel.rect(140, 80, 106, 60, 1)
-            pyxel.rectb(140, 80, 106, 60, 7)
-            commands = ["Attack", "Use Item", "Run"]
-            pyxel.text(150, 70, "Commands:", 7)
-            for i, cmd in enumerate(commands):
-                prefix = "> " if i == self.battle_command else "  "
-                pyxel.text(150, 90 + i * 10, prefix + cmd, 7)
-
-        
-        # 敵のHPバー
-        enemy_hp_ratio = max(self.current_enemy.hp / 30, 0)
-        pyxel.rect(100, 40, 100, 5, 8)  # 背景（赤）
-        pyxel.rect(100, 40, int(100 * enemy_hp_ratio), 5, 11)  # HP（緑）
+            screen["commands"].set(commands={"selected": self.battle_command},
+                                   preview={"text": self.command_preview(BATTLE_COMMANDS[self.battle_command])})
+        elif self.battle_state == "item_selection":
+            items = [item.name if isinstance(item, Equipment) else str(item) for item in self.inventory]
+            screen["items"]["items"].set(items=items, selected=self.menu_selection)
+        screen.draw(self.battle_state)
 
-        pyxel.rect(10, 80, 120, 40, 1)
-        pyxel.rectb(10, 80, 120, 40, 7)
-        pyxel.text(20, 90, f"HP: {self.player_hp}/{self.player_max_hp}", 7)
-
-        
-        # プレイヤーのHPバー
-        player_hp_ratio = max(self.player_hp / self.player_max_hp, 0)
-        pyxel.rect(20, 100, 100, 5, 8)  # 背景（赤）
-        pyxel.rect(20, 100, int(100 * player_hp_ratio), 5, 11)  # HP（緑）
-        
-        pyxel.rect(10, 130, 236, 40, 1)
-        pyxel.rectb(10, 130, 236, 40, 7)
-        pyxel.text(20, 140, self.battle_log, 7)
-        
-        if self.battle_state == "player_action":
-            pyxel.rect(140, 80, 106, 60, 1)
-            pyxel.rectb(140, 80, 106, 60, 7)
-            commands = ["Attack", "Use Item", "Run"]
-            pyxel.text(150, 70, "Commands:", 7)
-            for i, cmd in enumerate(commands):
-                prefix = "> " if i == self.battle_command else "  "
-                pyxel.text(150, 90 + i * 10, prefix + cmd, 7)
-
-
-        if self.battle_state == "item_selection":
-            pyxel.rect(50, 50, 160, 100, 1)
-            pyxel.rectb(50, 50, 160, 100, 7)
-            pyxel.text(60, 60, "Select Item:", 7)
-            for i, item in enumerate(self.inventory):
-                prefix = "> " if i == self.menu_selection else "  "
-                pyxel.text(70, 80 + i * 10, prefix + item, 7)
-        
 App()